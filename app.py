@@ -1,19 +1,55 @@
+import time
+
+# Measure how long each rerun of the script takes
+SCRIPT_START = time.perf_counter()
+
 import streamlit as st
-from googletrans import Translator
-from gtts import gTTS
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import os
-import tempfile
-import base64
 from datetime import datetime
-import time
-import speech_recognition as sr
-from pydub import AudioSegment
-import io
-import azure.cognitiveservices.speech as speechsdk
-from dotenv import load_dotenv
-import asyncio
-import re
-import subprocess
+import threading
+import uuid
+from audio_cache import get_audio_cache
+from history_store import get_history_store
+from jobs import get_job_queue
+from lazy_imports import startup_report
+import tracing
+from bundle import make_bundle
+from pipeline import (
+    AUDIO_OUTPUT_ENCODING,
+    ENGINE_HEDGING,
+    LANGUAGES,
+    OUTPUT_ENCODINGS,
+    SynthesisError,
+    TranslationError,
+    audio_format,
+    azure_available,
+    check_ffmpeg,
+    encode_for_delivery,
+    engine_stats,
+    fan_out_targets,
+    join_speech,
+    prewarm_azure,
+    set_notifier,
+    speech_fan_out_job,
+    speech_job,
+    speech_to_many,
+    speech_to_text_segments,
+    synthesize,
+    text_fan_out_job,
+    text_job,
+    transcript_text,
+    translate_and_synthesize_stream,
+    translate_text,
+    translate_to_many,
+)
+from speech_chunks import format_timestamp
+from task_graph import TaskError, TaskGraph
+from providers import provider_stats
+from result_memo import get_result_memo, memo_key
+from scratch import get_scratch_space
+from segmentation import join_segments
+from translation_memory import get_translation_memory
 
 # Set page config - MUST be the first Streamlit command
 st.set_page_config(
@@ -22,18 +58,7 @@ st.set_page_config(
     layout="wide"
 )
 
-# Check FFmpeg availability
-def check_ffmpeg():
-    try:
-        subprocess.run(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return True
-    except FileNotFoundError:
-        return False
-
-# Global flag for FFmpeg availability
-FFMPEG_AVAILABLE = check_ffmpeg()
-
-if not FFMPEG_AVAILABLE:
+if not check_ffmpeg():
     st.warning("""
     ⚠️ FFmpeg n'est pas détecté sur votre système. Certaines fonctionnalités audio peuvent être limitées.
     Pour installer FFmpeg:
@@ -42,222 +67,44 @@ if not FFMPEG_AVAILABLE:
     3. Redémarrez votre terminal et l'application
     """)
 
-# Load environment variables
-load_dotenv()
-
-# Language options with codes and display names
-LANGUAGES = {
-    'en': 'English',
-    'fr': 'French',
-    'es': 'Spanish',
-    'de': 'German',
-    'it': 'Italian',
-    'pt': 'Portuguese',
-    'ru': 'Russian',
-    'ja': 'Japanese',
-    'zh-cn': 'Chinese (Simplified)',
-    'ar': 'Arabic'
-}
+# Show pipeline warnings and errors on the page
+def show_notification(level, message):
+    if level == "error":
+        st.error(message)
+    else:
+        st.warning(message)
 
-# Speech recognition language mapping
-SR_LANGUAGES = {
-    'en': 'en-US',
-    'fr': 'fr-FR',
-    'es': 'es-ES',
-    'de': 'de-DE',
-    'it': 'it-IT',
-    'pt': 'pt-BR',
-    'ru': 'ru-RU',
-    'ja': 'ja-JP',
-    'zh-cn': 'zh-CN',
-    'ar': 'ar-SA'
-}
+set_notifier(show_notification)
 
-# Azure TTS voice mapping (more natural voices)
-AZURE_VOICES = {
-    'en': 'en-US-AriaNeural',
-    'fr': 'fr-FR-DeniseNeural',
-    'es': 'es-ES-ElviraNeural',
-    'de': 'de-DE-KatjaNeural',
-    'it': 'it-IT-ElsaNeural',
-    'pt': 'pt-BR-FranciscaNeural',
-    'ru': 'ru-RU-SvetlanaNeural',
-    'ja': 'ja-JP-NanamiNeural',
-    'zh-cn': 'zh-CN-XiaoxiaoNeural',
-    'ar': 'ar-SA-ZariyahNeural'
+# Names of the playback and download encodings shown in Settings
+ENCODING_LABELS = {
+    'original': "Original (as produced by the voice engine)",
+    'mp3-64k': "MP3, 64 kbit/s mono",
+    'mp3-32k': "MP3, 32 kbit/s mono",
+    'opus-32k': "Opus (Ogg), 32 kbit/s mono",
+    'opus-16k': "Opus (Ogg), 16 kbit/s mono",
 }
 
-async def translate_text_async(text, target_lang):
-    """Async function to translate text"""
-    translator = Translator()
-    translation = await translator.translate(text, dest=target_lang)
-    return translation.text
+def delivered_audio(audio_bytes):
+    """Audio in the playback and download encoding chosen in Settings"""
+    return encode_for_delivery(audio_bytes, st.session_state.get("output_encoding", AUDIO_OUTPUT_ENCODING))
 
-def translate_text(text, target_lang):
-    """Synchronous wrapper for the async translation function"""
-    try:
-        # Use a different approach to handle the coroutine
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(translate_text_async(text, target_lang))
-        loop.close()
-        return result
-    except Exception as e:
-        st.error(f"Translation error: {str(e)}")
-        # Fallback to direct approach if async fails
-        try:
-            translator = Translator()
-            translation = translator.translate(text, dest=target_lang)
-            if hasattr(translation, 'text'):
-                return translation.text
-            return text
-        except:
-            return text  # Return original text if all translation attempts fail
-
-def text_to_speech(text, lang):
-    """Generate speech using gTTS (standard quality)"""
-    tts = gTTS(text=text, lang=lang)
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as fp:
-        tts.save(fp.name)
-        return fp.name
-
-def text_to_speech_improved(text, lang):
-    """Generate better quality speech by breaking text into natural phrases"""
-    try:
-        # Break text at punctuation for better phrasing
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        if len(sentences) <= 1:
-            # If there's only one sentence, use standard TTS
-            return text_to_speech(text, lang)
-        
-        audio_files = []
-        # Create audio for each sentence with a slight pause between
-        for sentence in sentences:
-            if not sentence.strip():
-                continue
-                
-            tts = gTTS(text=sentence.strip(), lang=lang)
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as fp:
-                tts.save(fp.name)
-                audio_files.append(fp.name)
-        
-        if not audio_files:
-            return text_to_speech(text, lang)
-            
-        # Check if FFmpeg is available before attempting to combine audio
-        if not FFMPEG_AVAILABLE:
-            st.warning("FFmpeg n'est pas disponible. Utilisation de la voix standard.")
-            # Clean up temporary files
-            for file in audio_files:
-                try:
-                    os.unlink(file)
-                except:
-                    pass
-            return text_to_speech(text, lang)
-            
-        # Combine audio files with pydub
-        try:
-            combined = AudioSegment.empty()
-            for audio_file in audio_files:
-                try:
-                    segment = AudioSegment.from_mp3(audio_file)
-                    combined += segment
-                    # Add a small pause between sentences
-                    combined += AudioSegment.silent(duration=300)
-                except Exception as e:
-                    st.error(f"Erreur lors du traitement du fichier audio: {str(e)}")
-                    # If there's an error with one file, try to continue with others
-                    continue
-                
-            if len(combined) == 0:
-                raise Exception("Aucun segment audio n'a pu être traité")
-                
-            # Save combined file
-            output_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3').name
-            combined.export(output_file, format="mp3")
-            
-            # Clean up temporary files
-            for file in audio_files:
-                try:
-                    os.unlink(file)
-                except:
-                    pass
-                    
-            return output_file
-        except Exception as e:
-            st.warning(f"Erreur lors de la combinaison audio: {str(e)}. Utilisation de la voix standard.")
-            # If audio combining fails, fall back to simple TTS
-            for file in audio_files:
-                try:
-                    os.unlink(file)
-                except:
-                    pass
-            return text_to_speech(text, lang)
-    except Exception as e:
-        st.warning(f"Erreur dans la voix améliorée: {str(e)}. Utilisation de la voix standard.")
-        return text_to_speech(text, lang)
-
-def text_to_speech_azure(text, lang):
-    """Generate more human-like speech using Azure Speech Service"""
-    # Check if Azure key is available
-    speech_key = os.getenv('AZURE_SPEECH_KEY')
-    speech_region = os.getenv('AZURE_SPEECH_REGION')
-    
-    if not speech_key or not speech_region:
-        # Fall back to improved TTS if Azure keys aren't available
-        return text_to_speech_improved(text, lang)
-    
-    # Create a speech config with the Azure keys
-    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
-    
-    # Set the voice based on the language
-    voice_name = AZURE_VOICES.get(lang, AZURE_VOICES['en'])
-    speech_config.speech_synthesis_voice_name = voice_name
-    
-    # Create a temporary file to save the audio
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-    audio_config = speechsdk.audio.AudioOutputConfig(filename=temp_file.name)
-    
-    # Create the synthesizer
-    speech_synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
-    
-    # Synthesize speech
-    result = speech_synthesizer.speak_text_async(text).get()
-    
-    if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-        return temp_file.name
-    else:
-        # Fall back to improved TTS if Azure fails
-        st.warning(f"Azure Speech synthesis failed: {result.reason}. Using enhanced TTS instead.")
-        return text_to_speech_improved(text, lang)
-
-def get_download_link(audio_path, filename):
-    """Generate a download link for an audio file"""
-    with open(audio_path, "rb") as file:
-        audio_bytes = file.read()
-    b64 = base64.b64encode(audio_bytes).decode()
-    href = f'<a href="data:audio/mp3;base64,{b64}" download="{filename}">Download {filename}</a>'
-    return href
-
-def speech_to_text(audio_bytes, language):
-    """Convert speech to text using Google Speech Recognition"""
-    # Save the uploaded audio to a temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_audio:
-        tmp_audio.write(audio_bytes)
-        tmp_audio_path = tmp_audio.name
-    
-    # Convert to WAV format for speech recognition
-    try:
-        recognizer = sr.Recognizer()
-        with sr.AudioFile(tmp_audio_path) as source:
-            audio_data = recognizer.record(source)
-            text = recognizer.recognize_google(audio_data, language=SR_LANGUAGES.get(language, language))
-            os.unlink(tmp_audio_path)  # Clean up temporary file
-            return text
-    except Exception as e:
-        os.unlink(tmp_audio_path)  # Clean up temporary file
-        return f"Error recognizing audio: {str(e)}"
+def download_button(audio_bytes, filename):
+    """Offer in-memory audio for download.
+    
+    Streamlit serves the bytes from its media endpoint when the button is
+    clicked, instead of inlining them base64-encoded in the page, and the
+    click does not rerun the script.
+    """
+    st.download_button(f"Download {filename}", data=audio_bytes, file_name=filename,
+                       mime=f"audio/{audio_format(audio_bytes)}", on_click="ignore", key=f"download_{filename}")
+
+# Entries shown per page of the History tab
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '20'))
+# Texts longer than this are always processed as background jobs
+BACKGROUND_JOB_CHARS = int(os.getenv('BACKGROUND_JOB_CHARS', '5000'))
+# Seconds between refreshes of the job list
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '2'))
 
 # Add custom CSS
 st.markdown("""
@@ -281,12 +128,6 @@ st.markdown("""
     .stButton>button:hover {
         background-color: #45a049;
     }
-    .download-link {
-        margin: 10px 0;
-        padding: 10px;
-        border-radius: 4px;
-        background-color: #f1f1f1;
-    }
     h1 {
         color: #2E86C1;
     }
@@ -300,12 +141,19 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state for history
-if 'history' not in st.session_state:
-    st.session_state.history = []
+# Identify this browser's history; the id is kept in the URL so reloading the page finds it again,
+# which also lets anyone given the link read it (the History tab can start a new session)
+if 'history_session' not in st.session_state:
+    st.session_state.history_session = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.history_session
+
+# Background jobs submitted from this session, and those already added to the history
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = []
+    st.session_state.jobs_in_history = set()
 
 # Create a settings tab for API keys
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Text Translation", "Speech to Text", "History", "Settings", "About"])
+tab1, tab2, tab3, tab6, tab4, tab5 = st.tabs(["Text Translation", "Speech to Text", "History", "Jobs", "Settings", "About"])
 
 with tab4:
     st.header("Settings")
@@ -313,8 +161,9 @@ with tab4:
     
     voice_quality = st.radio(
         "Choose voice quality:",
-        ["Standard (Google TTS)", "Premium (Human-like Azure TTS)"],
-        index=1
+        ["Standard (Google TTS)", "Premium (Human-like Azure TTS)", "Automatic (fastest available engine)"],
+        index=1,
+        key="voice_quality"
     )
     
     if voice_quality == "Premium (Human-like Azure TTS)":
@@ -332,38 +181,327 @@ with tab4:
             os.environ["AZURE_SPEECH_KEY"] = azure_key
             os.environ["AZURE_SPEECH_REGION"] = azure_region
             st.success("Settings saved successfully!")
-    else:
+    elif voice_quality == "Standard (Google TTS)":
         st.info("Standard voice uses Google's Text-to-Speech service and doesn't require any API keys.")
+    else:
+        st.info("Each request goes to the engine that has been fastest recently, falling back to the others on errors.")
+    st.checkbox("Hedge slow requests", value=ENGINE_HEDGING, key="hedge_requests",
+                help="Also send a request to a second engine when the first is slower than usual")
+    
+    st.markdown("### Audio Output")
+    st.selectbox("Playback and download format:", list(OUTPUT_ENCODINGS),
+                 index=list(OUTPUT_ENCODINGS).index(AUDIO_OUTPUT_ENCODING) if AUDIO_OUTPUT_ENCODING in OUTPUT_ENCODINGS else 0,
+                 format_func=lambda encoding: ENCODING_LABELS.get(encoding, encoding), key="output_encoding",
+                 help="Compact encodings make files several times smaller than the engines' output")
+    if st.session_state.output_encoding != 'original' and not check_ffmpeg():
+        st.info("Re-encoding audio requires FFmpeg; audio is served in its original format until it is installed.")
+    
+    st.markdown("### Audio Cache")
+    # Sizes are running estimates; the directories are only scanned when asked to
+    cache_stats = get_audio_cache().stats(scan=st.session_state.get("scan_audio_cache", False))
+    st.text(f"Hits: {cache_stats['hits']} | Misses: {cache_stats['misses']} | Hit rate: {cache_stats['hit_rate']:.0%}")
+    st.text(f"Size: {cache_stats['size_bytes'] / 1024 / 1024:.1f} MB / {cache_stats['max_bytes'] / 1024 / 1024:.0f} MB")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Clear audio cache"):
+            get_audio_cache().clear()
+            st.success("Audio cache cleared!")
+    with col2:
+        st.button("Measure cache size", key="scan_audio_cache",
+                  help="Scan the cache directory instead of showing the running estimate")
+    
+    st.markdown("### Remembered Results")
+    memo_stats = get_result_memo().stats()
+    st.text(f"Reused: {memo_stats['hits']} | Entries: {memo_stats['entries']} / {memo_stats['max_entries']} | Size: {memo_stats['size_bytes'] / 1024 / 1024:.1f} MB / {memo_stats['max_bytes'] / 1024 / 1024:.0f} MB")
+    if st.button("Clear remembered results"):
+        get_result_memo().clear()
+        st.session_state.pop("text_result", None)
+        st.session_state.pop("speech_result", None)
+        st.success("Remembered results cleared!")
+    
+    st.markdown("### Scratch Space")
+    scratch_stats = get_scratch_space().usage(scan=st.session_state.get("scan_scratch_space", False))
+    st.text(f"Size: {scratch_stats['size_bytes'] / 1024 / 1024:.1f} MB / {scratch_stats['max_bytes'] / 1024 / 1024:.0f} MB | Requests in progress: {scratch_stats['live_scopes']}")
+    if "disk_bytes" in scratch_stats:
+        st.text(f"On disk: {scratch_stats['files']} temporary files, {scratch_stats['disk_bytes'] / 1024 / 1024:.1f} MB")
+    st.text(f"Requests refused over quota: {scratch_stats['rejected']} | Orphan cleanups: {scratch_stats['reaped']}")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Remove orphaned files"):
+            freed = get_scratch_space().reap()
+            st.success(f"Removed {freed / 1024 / 1024:.1f} MB of orphaned files")
+    with col2:
+        st.button("Measure scratch space", key="scan_scratch_space",
+                  help="Scan the scratch directory for temporary files on disk")
+    
+    st.markdown("### Translation Memory")
+    memory_stats = get_translation_memory().stats()
+    st.text(f"Reused segments: {memory_stats['hits']} | Translated segments: {memory_stats['misses']} | Stored: {memory_stats['entries']} / {memory_stats['max_entries']}")
+    if st.button("Clear translation memory"):
+        get_translation_memory().clear()
+        st.success("Translation memory cleared!")
+    
+    st.markdown("### Engines")
+    st.dataframe(engine_stats(), use_container_width=True)
+    st.caption("Upstream requests shared between sessions, retried after rate limiting, and time spent throttled")
+    st.dataframe(provider_stats(), use_container_width=True)
+    
+    st.markdown("### Latency")
+    st.caption("Duration of each pipeline stage in seconds, by cache outcome and engine")
+    latency = tracing.summary()
+    if latency:
+        st.dataframe([{**{key: value for key, value in row.items() if key != "labels"},
+                       "labels": ", ".join(f"{key}={value}" for key, value in row["labels"].items())}
+                      for row in latency], use_container_width=True)
+    else:
+        st.text("No operation measured yet.")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Export metrics (Prometheus)", data=tracing.prometheus_text(), file_name="metrics.prom",
+                           mime="text/plain", on_click="ignore")
+    with col2:
+        st.download_button("Export metrics (JSON)", data=tracing.metrics_json(), file_name="metrics.json",
+                           mime="application/json", on_click="ignore")
+    
+    st.markdown("### Startup Report")
+    with st.expander("Import and probe timings"):
+        report = startup_report()
+        st.text(f"Process uptime: {report['process_uptime']} s")
+        if 'last_rerun_ms' in st.session_state:
+            st.text(f"Previous rerun of the page: {st.session_state.last_rerun_ms} ms")
+        for name, seconds in sorted(report["imports"].items(), key=lambda item: -item[1]):
+            st.text(f"import {name}: {round(seconds * 1000, 1)} ms")
+        for name, seconds in report["probes"].items():
+            st.text(f"probe {name}: {round(seconds * 1000, 1)} ms")
 
 # Title
 st.title("🌍 Text-to-Speech Translator")
 st.markdown("---")
 
-# Use the selected TTS engine based on settings
-def selected_tts_engine(text, lang):
-    if 'voice_quality' in locals() and voice_quality == "Premium (Human-like Azure TTS)":
-        return text_to_speech_azure(text, lang)
+def script_context_initializer():
+    """Return a thread initializer that lets worker threads write to the current page"""
+    ctx = get_script_run_ctx()
+    return lambda: add_script_run_ctx(threading.current_thread(), ctx)
+
+def render_streamed_translation(text, target_lang, source_lang, engine=None, hedge=None):
+    """Show translated sentences and their audio progressively.
+    
+    Returns the translation, its audio and a message for every sentence
+    that failed; those are left out of the translation and the audio.
+    """
+    start_time = time.time()
+    st.markdown("### Translation:")
+    translation_placeholder = st.empty()
+    st.markdown("### Translated Audio (streaming):")
+    pieces, chunks, spoken, failures = [], [], [], []
+    for index, (translated, separator, audio_bytes, error) in enumerate(translate_and_synthesize_stream(
+            text, target_lang, source_lang, engine, hedge, initializer=script_context_initializer()), 1):
+        if translated is not None:
+            pieces.append((translated, separator))
+            translation_placeholder.write(join_segments(pieces, target_lang))
+        if error is not None:
+            failures.append(f"Sentence {index} was left out: {error}")
+            st.warning(failures[-1])
+            continue
+        chunks.append(audio_bytes)
+        spoken.append(translated)
+        st.audio(audio_bytes, format=f"audio/{audio_format(audio_bytes)}")
+        if len(chunks) == 1:
+            st.caption(f"First audio ready after {round(time.time() - start_time, 2)} seconds")
+    
+    translated_text = join_segments(pieces, target_lang)
+    if not chunks:
+        raise SynthesisError("No sentence could be translated and synthesized")
+    try:
+        translated_audio = join_speech(chunks, spoken)
+    except ValueError:
+        # Joining needs FFmpeg when the chunks cannot be concatenated as they are
+        translated_audio = synthesize(" ".join(spoken), target_lang, engine, hedge=hedge)
+    return translated_text, translated_audio, failures
+
+def selected_engine(enhanced):
+    """Return the (engine name, hedge) chosen in the settings tab"""
+    voice_quality = st.session_state.get("voice_quality")
+    if voice_quality == "Premium (Human-like Azure TTS)":
+        engine = "azure"
+    elif voice_quality == "Automatic (fastest available engine)":
+        engine = None
     else:
-        return text_to_speech(text, lang)
+        engine = "gtts-enhanced" if enhanced else "gtts"
+    return engine, st.session_state.get("hedge_requests", ENGINE_HEDGING)
+
+# Use the selected TTS engine based on settings
+def selected_tts_engine(enhanced):
+    """Return a TTS function for the voice chosen in the settings tab"""
+    # Read the settings here, the returned function may run in worker threads
+    engine, hedge = selected_engine(enhanced)
+    return lambda text, lang: synthesize(text, lang, engine, hedge=hedge)
+
+def remember_result(state_key, key, result, message):
+    """Keep a result in this session so it is shown again on reruns of the page"""
+    st.session_state[state_key] = {"key": key, "result": result, "message": message}
+
+def forget_button(state_key):
+    """Let the user drop the page result remembered for this request; cached translations and audio are kept"""
+    if st.button("Forget this result", key=f"forget_{state_key}",
+                 help="Stop showing this result and remember it no longer. Translations and audio already "
+                      "in the translation memory and the audio cache are still reused by the next request; "
+                      "clear them in Settings to fetch everything again"):
+        get_result_memo().invalidate(st.session_state[state_key]["key"])
+        del st.session_state[state_key]
+        st.rerun()
+
+def show_text_result(state_key):
+    """Show the translation and both audio files of the text tab"""
+    entry = st.session_state[state_key]
+    result = entry["result"]
+    if result["enhanced_voice"]:
+        st.markdown("🎙️ *Using enhanced natural voice*")
+    st.markdown("### Translation:")
+    st.write(result["translated_text"])
+    for failure in result["failures"]:
+        st.warning(failure)
+    if result["critical_path"]:
+        st.caption(result["critical_path"])
+    
+    # Re-encode both files once, for the players and the downloads
+    original_audio = delivered_audio(result["original_audio"])
+    translated_audio = delivered_audio(result["translated_audio"])
+    
+    st.markdown("### Original Audio:")
+    st.audio(original_audio, format=f"audio/{audio_format(original_audio)}")
+    
+    st.markdown("### Translated Audio:")
+    st.audio(translated_audio, format=f"audio/{audio_format(translated_audio)}")
+    
+    # Provide download links
+    st.markdown("### Download Audio Files")
+    col1, col2 = st.columns(2)
+    with col1:
+        download_button(original_audio,
+                        f"original_{result['source_lang']}_{result['created']}.{audio_format(original_audio)}")
+    with col2:
+        download_button(translated_audio,
+                        f"translated_{result['target_lang']}_{result['created']}.{audio_format(translated_audio)}")
+    
+    st.info(entry["message"])
+    forget_button(state_key)
+
+def show_speech_result(state_key):
+    """Show the transcript, its translation and the translated audio of the speech tab"""
+    entry = st.session_state[state_key]
+    result = entry["result"]
+    segments = result["segments"]
+    st.markdown("### Transcribed Text:")
+    st.write(result["original_text"])
+    failed_segments = [segment for segment in segments if segment["error"]]
+    if failed_segments:
+        st.warning(f"{len(failed_segments)} of {len(segments)} audio chunks could not be recognized.")
+    if len(segments) > 1:
+        with st.expander("Transcript timeline"):
+            for segment in segments:
+                st.text(f"[{format_timestamp(segment['start'])} - {format_timestamp(segment['end'])}] "
+                        f"{segment['text'] or '(no speech)'}")
+    
+    st.markdown("### Translated Text:")
+    st.write(result["translated_text"])
+    if result["enhanced_voice"]:
+        st.markdown("🎙️ *Using enhanced natural voice*")
+    translated_audio = delivered_audio(result["translated_audio"])
+    st.markdown("### Translated Audio:")
+    st.audio(translated_audio, format=f"audio/{audio_format(translated_audio)}")
+    
+    # Provide download link
+    download_button(translated_audio,
+                    f"translated_{result['target_lang']}_{result['created']}.{audio_format(translated_audio)}")
+    
+    st.info(entry["message"])
+    forget_button(state_key)
+
+def result_bundle(result, result_key):
+    """ZIP bundle of a multi-language result in the delivery encoding, built once and reused on reruns"""
+    encoding = st.session_state.get("output_encoding", AUDIO_OUTPUT_ENCODING)
+    key = memo_key("bundle", result_key, created=result.get("created"), encoding=encoding)
+    bundle = get_result_memo().get(key)
+    if bundle is None:
+        bundle = make_bundle(result, delivered_audio)
+        get_result_memo().put(key, bundle)
+    return bundle
+
+def show_targets(result, suffix, result_key):
+    """Show the original and every translation of a multi-language result, with all of them as one ZIP"""
+    st.markdown("### Original:")
+    st.write(result["original_text"])
+    # The original of a speech result is the uploaded recording, already shown above it
+    if result["original_audio"] and "segments" not in result:
+        original_audio = delivered_audio(result["original_audio"])
+        st.audio(original_audio, format=f"audio/{audio_format(original_audio)}")
+    for lang, target in result["targets"].items():
+        st.markdown(f"### {LANGUAGES[lang]}:")
+        if target["error"]:
+            st.error(f"{target['error']}. The translation service may be busy, please try again in a moment.")
+            continue
+        st.write(target["translated_text"])
+        translated_audio = delivered_audio(target["translated_audio"])
+        st.audio(translated_audio, format=f"audio/{audio_format(translated_audio)}")
+        download_button(translated_audio, f"translated_{lang}_{suffix}.{audio_format(translated_audio)}")
+    
+    st.markdown("### Download All Languages")
+    st.caption("One audio file per language and a manifest.json describing them")
+    st.download_button("Download ZIP bundle", data=result_bundle(result, result_key),
+                       file_name=f"translations_{result['source_lang']}_{suffix}.zip", mime="application/zip",
+                       on_click="ignore", key=f"bundle_{suffix}")
+
+def show_fan_out_result(state_key):
+    """Show a multi-language result of the text or speech tab"""
+    entry = st.session_state[state_key]
+    show_targets(entry["result"], entry["result"]["created"], entry["key"])
+    st.info(entry["message"])
+    forget_button(state_key)
+
+def add_fan_out_history(result, entry_type, enhanced_voice, process_time, created_at=None):
+    """Add one history entry per language a multi-language result was translated into"""
+    for lang, target in result["targets"].items():
+        if target["error"]:
+            continue
+        entry = {
+            "original_text": result["original_text"],
+            "translated_text": target["translated_text"],
+            "source_lang": result["source_lang"],
+            "target_lang": lang,
+            "process_time": process_time,
+            "type": entry_type,
+            "enhanced_voice": enhanced_voice
+        }
+        if created_at is not None:
+            entry["created_at"] = created_at
+        get_history_store().add(st.session_state.history_session, entry)
+
+def submit_job(kind, fn, *args, stages, description):
+    """Queue a background job and remember it in this session"""
+    job_id = get_job_queue().submit(kind, fn, *args, stages=stages, description=description)
+    st.session_state.jobs.append(job_id)
+    st.success(f"Job `{job_id}` submitted. Follow its progress and get the results in the Jobs tab.")
+    return job_id
 
 with tab1:
     st.header("Text to Speech Translation")
-# Input text area
-input_text = st.text_area("Enter your text here:", height=150)
-
-# Language selection
-col1, col2 = st.columns(2)
-with col1:
-    source_lang = st.selectbox(
-        "Select source language:",
+    # Input text area
+    input_text = st.text_area("Enter your text here:", height=150)
+    
+    # Language selection
+    col1, col2 = st.columns(2)
+    with col1:
+        source_lang = st.selectbox(
+            "Select source language:",
             list(LANGUAGES.keys()),
             format_func=lambda x: LANGUAGES[x],
             index=list(LANGUAGES.keys()).index('en'),
             key="text_source_lang"
-    )
-with col2:
-    target_lang = st.selectbox(
-        "Select target language:",
+        )
+    with col2:
+        target_lang = st.selectbox(
+            "Select target language:",
             list(LANGUAGES.keys()),
             format_func=lambda x: LANGUAGES[x],
             index=list(LANGUAGES.keys()).index('fr'),
@@ -373,66 +511,134 @@ with col2:
     # Voice quality selection for this specific translation
     use_enhanced_voice = st.checkbox("Use enhanced natural voice", value=True, 
                                 help="Break text into natural phrases for better intonation")
+    stream_audio = st.checkbox("Stream audio sentence by sentence", value=False,
+                               help="Play the first translated sentences while the rest is still being generated")
+    run_in_background = st.checkbox("Run as a background job", value=False,
+                                    help=f"Texts longer than {BACKGROUND_JOB_CHARS} characters always run in the background")
+    multi_target = st.checkbox("Translate into several languages", value=False, key="text_multi_target",
+                               help="Synthesize the original once and translate it into every selected language at the same time")
+    if multi_target:
+        # The source language is left out whatever is selected
+        target_langs = fan_out_targets(source_lang, st.multiselect(
+            "Target languages:", list(LANGUAGES.keys()), default=list(LANGUAGES.keys()),
+            format_func=lambda x: LANGUAGES[x], key="text_target_langs"))
 
+    # Identical requests, from any session, reuse the same result; the hedging setting only affects latency
+    if multi_target:
+        text_key = memo_key("text-many", input_text, source_lang=source_lang, target_langs=target_langs,
+                            engine=selected_engine(use_enhanced_voice)[0], enhanced_voice=use_enhanced_voice)
+    else:
+        text_key = memo_key("text", input_text, source_lang=source_lang, target_lang=target_lang,
+                            engine=selected_engine(use_enhanced_voice)[0], enhanced_voice=use_enhanced_voice)
     if st.button("Translate and Generate Audio", key="text_translate_btn"):
-    if input_text:
-        with st.spinner("Translating and generating audio..."):
-                start_time = time.time()
-                
-            # Translate text
-            translated_text = translate_text(input_text, target_lang)
-            st.markdown("### Translation:")
-            st.write(translated_text)
-            
-            # Generate audio for original text
-                if use_enhanced_voice:
-                    st.markdown("🎙️ *Using enhanced natural voice*")
-                    original_audio_path = text_to_speech_improved(input_text, source_lang)
-                    translated_audio_path = text_to_speech_improved(translated_text, target_lang)
-                else:
-            original_audio_path = text_to_speech(input_text, source_lang)
-                    translated_audio_path = text_to_speech(translated_text, target_lang)
-                
-            st.markdown("### Original Audio:")
-            st.audio(original_audio_path)
-            
-            # Generate audio for translated text
-            st.markdown("### Translated Audio:")
-            st.audio(translated_audio_path)
+        if input_text and multi_target and not target_langs:
+            st.warning("Please select at least one target language other than the source language.")
+        elif input_text and multi_target and (run_in_background or len(input_text) > BACKGROUND_JOB_CHARS):
+            engine, hedge = selected_engine(use_enhanced_voice)
+            submit_job("text", text_fan_out_job, input_text, source_lang, target_langs, engine, hedge,
+                       stages=("languages",),
+                       description=f"{LANGUAGES[source_lang]} → {len(target_langs)} languages: {' '.join(input_text[:60].split())}")
+        elif input_text and (run_in_background or len(input_text) > BACKGROUND_JOB_CHARS):
+            engine, hedge = selected_engine(use_enhanced_voice)
+            submit_job("text", text_job, input_text, source_lang, target_lang, engine, hedge,
+                       stages=("original_audio", "translation", "translated_audio"),
+                       description=f"{LANGUAGES[source_lang]} → {LANGUAGES[target_lang]}: {' '.join(input_text[:60].split())}")
+        elif input_text and multi_target:
+            start_time = time.time()
+            result = get_result_memo().get(text_key)
+            if result is not None:
+                message = "Reused the result of an earlier identical request"
+            else:
+                engine, hedge = selected_engine(use_enhanced_voice)
+                with st.spinner(f"Translating into {len(target_langs)} languages and generating audio..."):
+                    try:
+                        result = translate_to_many(input_text, source_lang, target_langs, engine, hedge,
+                                                   initializer=script_context_initializer())
+                    except TaskError as e:
+                        st.error(f"{e.__cause__ or e}. The speech service may be busy, please try again in a moment.")
+                        st.stop()
+                result["created"] = datetime.now().strftime('%Y%m%d%H%M%S')
+                # Languages that failed are worth retrying
+                if not any(target["error"] for target in result["targets"].values()):
+                    get_result_memo().put(text_key, result)
+                message = f"Processing completed in {round(time.time() - start_time, 2)} seconds"
+            add_fan_out_history(result, "text", use_enhanced_voice, round(time.time() - start_time, 2))
+            remember_result("text_result", text_key, result, message)
+        elif input_text:
+            start_time = time.time()
+            result = get_result_memo().get(text_key)
+            if result is not None:
+                message = "Reused the result of an earlier identical request"
+            else:
+                with st.spinner("Translating and generating audio..."):
+                    # Original audio does not depend on the translation, so it runs concurrently with it
+                    tts_engine = selected_tts_engine(use_enhanced_voice)
+                    graph = TaskGraph()
+                    graph.add("original_audio", lambda: tts_engine(input_text, source_lang))
+                    if not stream_audio:
+                        graph.add("translation", lambda: translate_text(input_text, target_lang, source_lang))
+                        graph.add("translated_audio", lambda translated: tts_engine(translated, target_lang),
+                                  deps=["translation"])
+                    graph.start(initializer=script_context_initializer())
+                    
+                    # Translate text, streaming the translated audio sentence by sentence if requested;
+                    # the streamed pieces are replaced by the complete result once it is ready
+                    failures = []
+                    try:
+                        if stream_audio:
+                            engine, hedge = selected_engine(use_enhanced_voice)
+                            live = st.empty()
+                            with live.container():
+                                translated_text, translated_audio, failures = render_streamed_translation(
+                                    input_text, target_lang, source_lang, engine, hedge)
+                            live.empty()
+                        else:
+                            translated_text = graph.result("translation")
+                            translated_audio = graph.result("translated_audio")
+                        original_audio = graph.result("original_audio")
+                    except (TaskError, TranslationError, SynthesisError) as e:
+                        st.error(f"{e.__cause__ or e}. The translation or speech service may be busy, please try again in a moment.")
+                        st.stop()
+                    
+                    critical_path, critical_time = graph.critical_path()
+                    result = {
+                        "original_text": input_text,
+                        "translated_text": translated_text,
+                        "original_audio": original_audio,
+                        "translated_audio": translated_audio,
+                        "source_lang": source_lang,
+                        "target_lang": target_lang,
+                        "enhanced_voice": use_enhanced_voice,
+                        "critical_path": "Critical path: " + " → ".join(f"{name} ({duration}s)" for name, duration in critical_path)
+                                         + f" | {critical_time}s in total",
+                        "failures": failures,
+                        "created": datetime.now().strftime('%Y%m%d%H%M%S'),
+                    }
+                # Sentences that failed are worth retrying
+                if not failures:
+                    get_result_memo().put(text_key, result)
+                message = f"Processing completed in {round(time.time() - start_time, 2)} seconds"
             
-                # Provide download links
-                st.markdown("### Download Audio Files")
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    original_filename = f"original_{source_lang}_{datetime.now().strftime('%Y%m%d%H%M%S')}.mp3"
-                    st.markdown(get_download_link(original_audio_path, original_filename), unsafe_allow_html=True)
-                
-                with col2:
-                    translated_filename = f"translated_{target_lang}_{datetime.now().strftime('%Y%m%d%H%M%S')}.mp3"
-                    st.markdown(get_download_link(translated_audio_path, translated_filename), unsafe_allow_html=True)
-                
-                # Add to history
-                process_time = round(time.time() - start_time, 2)
-                st.session_state.history.append({
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "original_text": input_text,
-                    "translated_text": translated_text,
-                    "source_lang": LANGUAGES[source_lang],
-                    "target_lang": LANGUAGES[target_lang],
-                    "process_time": process_time,
-                    "type": "text",
-                    "enhanced_voice": use_enhanced_voice
-                })
-                
-                # Display processing time
-                st.info(f"Processing completed in {process_time} seconds")
-                
-                # Clean up temporary files (do this in finally block to ensure cleanup)
-            os.unlink(original_audio_path)
-            os.unlink(translated_audio_path)
-    else:
-        st.warning("Please enter some text to translate.") 
+            # Add to history
+            get_history_store().add(st.session_state.history_session, {
+                "original_text": input_text,
+                "translated_text": result["translated_text"],
+                "source_lang": source_lang,
+                "target_lang": target_lang,
+                "process_time": round(time.time() - start_time, 2),
+                "type": "text",
+                "enhanced_voice": use_enhanced_voice
+            })
+            remember_result("text_result", text_key, result, message)
+        else:
+            st.warning("Please enter some text to translate.") 
+    
+    # The last result stays on the page across reruns for as long as the inputs match it
+    if st.session_state.get("text_result", {}).get("key") == text_key:
+        if multi_target:
+            show_fan_out_result("text_result")
+        else:
+            show_text_result("text_result")
 
 with tab2:
     st.header("Speech to Text Translation")
@@ -459,91 +665,182 @@ with tab2:
     # Voice quality selection for speech translation
     use_enhanced_voice_speech = st.checkbox("Use enhanced natural voice for translation", value=True,
                                          help="Break text into natural phrases for better intonation")
+    speech_multi_target = st.checkbox("Translate into several languages", value=False, key="speech_multi_target",
+                                      help="Transcribe the recording once and translate it into every selected language at the same time")
+    if speech_multi_target:
+        speech_target_langs = fan_out_targets(speech_source_lang, st.multiselect(
+            "Target languages:", list(LANGUAGES.keys()), default=list(LANGUAGES.keys()),
+            format_func=lambda x: LANGUAGES[x], key="speech_target_langs"))
     
     # Upload audio file
     uploaded_file = st.file_uploader("Upload an audio file (WAV, MP3, etc.)", type=["wav", "mp3", "ogg"])
     
+    speech_in_background = st.checkbox("Run as a background job", value=False, key="speech_background",
+                                       help="Return right away and follow the transcription in the Jobs tab")
+    
     if uploaded_file is not None:
         st.audio(uploaded_file)
         
-        if st.button("Transcribe and Translate", key="transcribe_btn"):
-            with st.spinner("Transcribing audio..."):
-                start_time = time.time()
-                
-                # Process audio file
-                audio_bytes = uploaded_file.read()
-                
-                # Transcribe audio
-                transcribed_text = speech_to_text(audio_bytes, speech_source_lang)
-                
+        # getvalue() returns the whole upload on every rerun, whatever was read from the file before
+        audio_bytes = uploaded_file.getvalue()
+        upload_format = os.path.splitext(uploaded_file.name)[1].lstrip('.').lower() or None
+        if speech_multi_target:
+            speech_key = memo_key("speech-many", audio_bytes, source_lang=speech_source_lang,
+                                  target_langs=speech_target_langs, audio_format=upload_format,
+                                  engine=selected_engine(use_enhanced_voice_speech)[0],
+                                  enhanced_voice=use_enhanced_voice_speech)
+        else:
+            speech_key = memo_key("speech", audio_bytes, source_lang=speech_source_lang, target_lang=speech_target_lang,
+                                  audio_format=upload_format, engine=selected_engine(use_enhanced_voice_speech)[0],
+                                  enhanced_voice=use_enhanced_voice_speech)
+        
+        transcribe_clicked = st.button("Transcribe and Translate", key="transcribe_btn")
+        if transcribe_clicked and speech_multi_target and not speech_target_langs:
+            st.warning("Please select at least one target language other than the source language.")
+        elif transcribe_clicked and speech_multi_target and speech_in_background:
+            engine, hedge = selected_engine(use_enhanced_voice_speech)
+            submit_job("speech", speech_fan_out_job, audio_bytes, speech_source_lang, speech_target_langs,
+                       upload_format, engine, hedge, stages=("transcription", "languages"),
+                       description=f"{LANGUAGES[speech_source_lang]} → {len(speech_target_langs)} languages: {uploaded_file.name}")
+        elif transcribe_clicked and speech_multi_target:
+            start_time = time.time()
+            result = get_result_memo().get(speech_key)
+            if result is not None:
+                message = "Reused the result of an earlier identical request"
+            else:
+                engine, hedge = selected_engine(use_enhanced_voice_speech)
+                with st.spinner(f"Transcribing audio and translating it into {len(speech_target_langs)} languages..."):
+                    try:
+                        result = speech_to_many(audio_bytes, speech_source_lang, speech_target_langs, upload_format,
+                                                engine, hedge, initializer=script_context_initializer())
+                    except (TaskError, SynthesisError) as e:
+                        st.error(f"{e.__cause__ or e}. The translation or speech service may be busy, please try again in a moment.")
+                        st.stop()
+                    except Exception as e:
+                        st.error(str(e) if str(e).startswith("Error") else f"Error recognizing audio: {str(e)}")
+                        st.stop()
+                result["created"] = datetime.now().strftime('%Y%m%d%H%M%S')
+                # Chunks or languages that failed are worth retrying
+                if not any(target["error"] for target in result["targets"].values()) and \
+                        not any(segment["error"] for segment in result["segments"]):
+                    get_result_memo().put(speech_key, result)
+                message = f"Processing completed in {round(time.time() - start_time, 2)} seconds"
+            add_fan_out_history(result, "speech", use_enhanced_voice_speech, round(time.time() - start_time, 2))
+            remember_result("speech_result", speech_key, result, message)
+        elif transcribe_clicked and speech_in_background:
+            engine, hedge = selected_engine(use_enhanced_voice_speech)
+            submit_job("speech", speech_job, audio_bytes, speech_source_lang, speech_target_lang,
+                       upload_format, engine, hedge, stages=("transcription", "translation", "translated_audio"),
+                       description=f"{LANGUAGES[speech_source_lang]} → {LANGUAGES[speech_target_lang]}: {uploaded_file.name}")
+        elif transcribe_clicked:
+            start_time = time.time()
+            result = get_result_memo().get(speech_key)
+            if result is not None:
+                message = "Reused the result of an earlier identical request"
+            else:
+                with st.spinner("Transcribing audio..."):
+                    # Transcribe audio chunk by chunk, decoding it according to its real format
+                    try:
+                        segments = speech_to_text_segments(audio_bytes, speech_source_lang, upload_format)
+                        transcribed_text = transcript_text(segments)
+                    except Exception as e:
+                        segments = []
+                        transcribed_text = f"Error recognizing audio: {str(e)}"
                 if "Error" in transcribed_text:
                     st.error(transcribed_text)
-                else:
-                    st.markdown("### Transcribed Text:")
-                    st.write(transcribed_text)
-                    
-                    # Translate transcribed text
-                    with st.spinner("Translating text..."):
-                        translated_text = translate_text(transcribed_text, speech_target_lang)
-                        st.markdown("### Translated Text:")
-                        st.write(translated_text)
-                        
-                        # Generate audio for translated text
-                        if use_enhanced_voice_speech:
-                            st.markdown("🎙️ *Using enhanced natural voice*")
-                            translated_audio_path = text_to_speech_improved(translated_text, speech_target_lang)
-                        else:
-                            translated_audio_path = text_to_speech(translated_text, speech_target_lang)
-                            
-                        st.markdown("### Translated Audio:")
-                        st.audio(translated_audio_path)
-                        
-                        # Provide download link
-                        translated_filename = f"translated_{speech_target_lang}_{datetime.now().strftime('%Y%m%d%H%M%S')}.mp3"
-                        st.markdown(get_download_link(translated_audio_path, translated_filename), unsafe_allow_html=True)
-                        
-                        # Add to history
-                        process_time = round(time.time() - start_time, 2)
-                        st.session_state.history.append({
-                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "original_text": transcribed_text,
-                            "translated_text": translated_text,
-                            "source_lang": LANGUAGES[speech_source_lang],
-                            "target_lang": LANGUAGES[speech_target_lang],
-                            "process_time": process_time,
-                            "type": "speech",
-                            "enhanced_voice": use_enhanced_voice_speech
-                        })
-                        
-                        # Display processing time
-                        st.info(f"Processing completed in {process_time} seconds")
-                        
-                        # Clean up temporary files
-                        os.unlink(translated_audio_path)
+                    st.stop()
+                
+                # Translate transcribed text and generate its audio
+                with st.spinner("Translating text..."):
+                    try:
+                        translated_text = translate_text(transcribed_text, speech_target_lang, speech_source_lang)
+                    except TranslationError as e:
+                        st.error(f"{e}. The translation service may be busy, please try again in a moment.")
+                        st.stop()
+                    try:
+                        translated_audio = selected_tts_engine(use_enhanced_voice_speech)(translated_text, speech_target_lang)
+                    except SynthesisError as e:
+                        st.error(f"{e}. The speech service may be busy, please try again in a moment.")
+                        st.stop()
+                result = {
+                    "original_text": transcribed_text,
+                    "segments": segments,
+                    "translated_text": translated_text,
+                    "translated_audio": translated_audio,
+                    "source_lang": speech_source_lang,
+                    "target_lang": speech_target_lang,
+                    "enhanced_voice": use_enhanced_voice_speech,
+                    "created": datetime.now().strftime('%Y%m%d%H%M%S'),
+                }
+                # Chunks that failed may be recognized on a later attempt
+                if not any(segment["error"] for segment in segments):
+                    get_result_memo().put(speech_key, result)
+                message = f"Processing completed in {round(time.time() - start_time, 2)} seconds"
+            
+            # Add to history
+            get_history_store().add(st.session_state.history_session, {
+                "original_text": result["original_text"],
+                "translated_text": result["translated_text"],
+                "source_lang": speech_source_lang,
+                "target_lang": speech_target_lang,
+                "process_time": round(time.time() - start_time, 2),
+                "type": "speech",
+                "enhanced_voice": use_enhanced_voice_speech
+            })
+            remember_result("speech_result", speech_key, result, message)
+        
+        if st.session_state.get("speech_result", {}).get("key") == speech_key:
+            if speech_multi_target:
+                show_fan_out_result("speech_result")
+            else:
+                show_speech_result("speech_result")
+
+# Open Azure connections for the languages in use before the first Premium request needs them
+if st.session_state.get("voice_quality") == "Premium (Human-like Azure TTS)" and azure_available():
+    prewarm_azure({source_lang, target_lang, speech_source_lang, speech_target_lang,
+                   *(target_langs if multi_target else ()), *(speech_target_langs if speech_multi_target else ())})
+
+HISTORY_FILTERS = {
+    "All": {},
+    "Text translations": {"entry_type": "text"},
+    "Speech transcriptions": {"entry_type": "speech"},
+    "Enhanced voice": {"enhanced_voice": True},
+    "Standard voice": {"enhanced_voice": False},
+}
 
 with tab3:
     st.header("Translation History")
     
-    if not st.session_state.history:
+    history = get_history_store()
+    session_id = st.session_state.history_session
+    if not history.count(session_id):
         st.info("No translation history yet. Try translating something!")
     else:
-        # Add filter for history type
-        history_filter = st.radio("Filter history by:", ["All", "Text translations", "Speech transcriptions", "Enhanced voice", "Standard voice"], horizontal=True)
+        # Filters run as indexed queries, only the current page is loaded
+        history_filter = st.radio("Filter history by:", list(HISTORY_FILTERS), horizontal=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            search = st.text_input("Search in texts:", key="history_search")
+        with col2:
+            pairs = [None] + history.language_pairs(session_id)
+            language_pair = st.selectbox(
+                "Language pair:", pairs,
+                format_func=lambda pair: "All" if pair is None else f"{LANGUAGES.get(pair[0], pair[0])} → {LANGUAGES.get(pair[1], pair[1])}")
+        filters = dict(HISTORY_FILTERS[history_filter], language_pair=language_pair, query=search)
         
-        filtered_history = st.session_state.history
-        if history_filter == "Text translations":
-            filtered_history = [item for item in st.session_state.history if item.get("type") == "text"]
-        elif history_filter == "Speech transcriptions":
-            filtered_history = [item for item in st.session_state.history if item.get("type") == "speech"]
-        elif history_filter == "Enhanced voice":
-            filtered_history = [item for item in st.session_state.history if item.get("enhanced_voice") == True]
-        elif history_filter == "Standard voice":
-            filtered_history = [item for item in st.session_state.history if item.get("enhanced_voice") == False]
+        total = history.count(session_id, **filters)
+        pages = max(1, -(-total // HISTORY_PAGE_SIZE))
+        page = st.number_input(f"Page (of {pages}):", min_value=1, max_value=pages, value=1, step=1,
+                               key="history_page") if pages > 1 else 1
+        st.caption(f"{total} entries")
         
-        for i, item in enumerate(reversed(filtered_history)):
-            type_icon = "📝" if item.get("type") == "text" else "🎤"
-            voice_icon = "🎙️" if item.get("enhanced_voice") else "🔊"
-            with st.expander(f"{type_icon} {voice_icon} {item['timestamp']} - {item['source_lang']} to {item['target_lang']}"):
+        for item in history.page(session_id, limit=HISTORY_PAGE_SIZE, offset=(page - 1) * HISTORY_PAGE_SIZE, **filters):
+            type_icon = "📝" if item["type"] == "text" else "🎤"
+            voice_icon = "🎙️" if item["enhanced_voice"] else "🔊"
+            timestamp = datetime.fromtimestamp(item["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            source_name = LANGUAGES.get(item["source_lang"], item["source_lang"])
+            target_name = LANGUAGES.get(item["target_lang"], item["target_lang"])
+            with st.expander(f"{type_icon} {voice_icon} {timestamp} - {source_name} to {target_name}"):
                 col1, col2 = st.columns(2)
                 with col1:
                     st.markdown("**Original Text:**")
@@ -556,8 +853,111 @@ with tab3:
                 st.text(f"Processing time: {item['process_time']} seconds")
                 
         if st.button("Clear History"):
-            st.session_state.history = []
-            st.experimental_rerun()
+            history.clear(session_id)
+            st.rerun()
+    
+    # The session id in the page address is all it takes to read this history
+    st.caption("Your history is tied to the address of this page: anyone you share the link with can read it. "
+               "Start a new session before sharing a link; the current history stays behind under the old one.")
+    if st.button("Start a new session"):
+        st.session_state.history_session = uuid.uuid4().hex
+        st.query_params["session"] = st.session_state.history_session
+        st.rerun()
+
+def show_job_result(job):
+    """Show the text and audio produced by a finished job, adding it to the history once"""
+    result = job.result
+    if "targets" in result:
+        show_targets(result, job.id, job.id)
+        if job.id not in st.session_state.jobs_in_history:
+            st.session_state.jobs_in_history.add(job.id)
+            add_fan_out_history(result, job.kind, result["engine"] != "gtts", round(job.finished - job.created, 2),
+                                created_at=job.finished)
+        return
+    st.markdown("**Original Text:**")
+    st.write(result["original_text"])
+    st.markdown("**Translated Text:**")
+    st.write(result["translated_text"])
+    for label, key, lang in (("Original Audio", "original_audio", result["source_lang"]),
+                             ("Translated Audio", "translated_audio", result["target_lang"])):
+        audio_bytes = result.get(key)
+        if audio_bytes:
+            audio_bytes = delivered_audio(audio_bytes)
+            st.markdown(f"**{label}:**")
+            st.audio(audio_bytes, format=f"audio/{audio_format(audio_bytes)}")
+            filename = f"{key.split('_')[0]}_{lang}_{job.id}.{audio_format(audio_bytes)}"
+            download_button(audio_bytes, filename)
+    
+    if job.id not in st.session_state.jobs_in_history:
+        st.session_state.jobs_in_history.add(job.id)
+        get_history_store().add(st.session_state.history_session, {
+            "created_at": job.finished,
+            "original_text": result["original_text"],
+            "translated_text": result["translated_text"],
+            "source_lang": result["source_lang"],
+            "target_lang": result["target_lang"],
+            "process_time": round(job.finished - job.created, 2),
+            "type": job.kind,
+            "enhanced_voice": result["engine"] != "gtts"
+        })
+
+def jobs_active():
+    """Whether some job followed by this session is still queued or running"""
+    queue = get_job_queue()
+    return any(job is not None and not job.done for job in map(queue.get, st.session_state.jobs))
+
+def render_jobs(polling=False):
+    """List this session's background jobs with their per-stage progress"""
+    queue = get_job_queue()
+    if polling and not jobs_active():
+        # Every job has finished: render the page once more, without polling
+        st.rerun()
+    if not st.session_state.jobs:
+        st.info("No background jobs yet. Check \"Run as a background job\" before translating a long text or recording.")
+        return
+    status_icons = {"queued": "⏳", "running": "⚙️", "done": "✅", "failed": "❌", "cancelled": "🚫"}
+    for job_id in reversed(st.session_state.jobs):
+        job = queue.get(job_id)
+        if job is None:
+            st.text(f"Job {job_id} has expired.")
+            continue
+        state = job.snapshot()
+        title = f"{status_icons[state['status']]} {state['description']} ({state['status']}, job {job_id})"
+        with st.expander(title, expanded=not job.done):
+            for stage, info in state["stages"].items():
+                label = f"{stage.replace('_', ' ')}: {info['state']}"
+                if info["seconds"] is not None:
+                    label += f" in {info['seconds']} s"
+                st.progress(info["progress"], text=label)
+            if state["status"] in ("queued", "running"):
+                st.button("Cancel", key=f"cancel_{job_id}", on_click=queue.cancel, args=(job_id,))
+            elif state["status"] == "done":
+                show_job_result(job)
+            elif state["status"] == "failed":
+                st.error(state["error"])
+
+# Refresh the job list on its own while the rest of the page stays idle, as long as some job is in progress
+if hasattr(st, "fragment"):
+    poll_jobs = st.fragment(run_every=JOB_POLL_SECONDS)(render_jobs)
+
+with tab6:
+    st.header("Background Jobs")
+    job_stats = get_job_queue().stats()
+    st.caption(f"Server: {job_stats['running']} running, {job_stats['queued']} queued")
+    followed_job = st.text_input("Follow a job by id:", key="follow_job_id",
+                                 help="Jobs keep running on the server, use their id to get back to them from a new session")
+    if followed_job and followed_job not in st.session_state.jobs:
+        if get_job_queue().get(followed_job) is None:
+            st.warning(f"No job {followed_job} on this server.")
+        else:
+            st.session_state.jobs.append(followed_job)
+    if not hasattr(st, "fragment"):
+        render_jobs()
+        st.button("Refresh jobs")
+    elif jobs_active():
+        poll_jobs(polling=True)
+    else:
+        render_jobs()
 
 with tab5:
     st.header("About This App")
@@ -577,6 +977,7 @@ with tab5:
     * Convertir la parole en texte et la traduire
     * Générer de l'audio pour le texte original et traduit
     * Utiliser une voix améliorée avec une meilleure intonation naturelle
+    * Traduire vers plusieurs langues en une seule fois et tout télécharger dans un fichier ZIP
     * Télécharger les fichiers audio générés
     * Consulter votre historique de traduction
     
@@ -604,5 +1005,14 @@ with tab5:
     
     ### Remarque sur la confidentialité
     Cette application utilise des services en ligne pour la traduction et la reconnaissance vocale et peut envoyer votre texte/audio à ces services.
-    Aucun texte, traduction ou fichier audio n'est stocké de façon permanente sur un serveur.
-    """) 
\ No newline at end of file
+    Le serveur conserve les données suivantes (durées par défaut, configurables) :
+    * **Historique** : vos textes et leurs traductions, liés à l'identifiant de session présent dans l'adresse de la page, pendant 30 jours. Toute personne disposant de ce lien peut les consulter ; utilisez « Start a new session » dans l'onglet History avant de partager un lien, ou « Clear History » pour les effacer.
+    * **Mémoire de traduction** : les phrases traduites, partagées entre tous les utilisateurs, pendant 30 jours.
+    * **Cache audio** : l'audio généré, sur le disque du serveur, jusqu'à ce que la limite de taille du cache (256 Mo) l'évince ; il peut être vidé dans l'onglet Settings.
+    * **Résultats récents** (transcriptions, traductions et audio) : en mémoire uniquement, jusqu'au redémarrage du serveur ou jusqu'à ce qu'ils soient évincés.
+    
+    Les fichiers audio envoyés ne sont pas enregistrés : leurs fichiers temporaires sont supprimés à la fin de chaque requête.
+    """) 
+
+# Remember how long this rerun took for the startup report
+st.session_state.last_rerun_ms = round((time.perf_counter() - SCRIPT_START) * 1000, 1)
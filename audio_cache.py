@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import unicodedata
+
+# Default location and size of the on-disk audio cache (overridable from the environment)
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "tts_translator_cache", "audio")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def normalize_text(text):
+    """Normalize text so trivially different inputs share a cache entry"""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+
+def make_key(engine, voice, lang, text, fmt):
+    """Build a content-addressed key from everything that affects the audio"""
+    payload = json.dumps(
+        [engine, voice or "", lang, normalize_text(text), fmt],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Persistent audio cache with LRU eviction under a byte budget.
+
+    Entries are stored as one file per key, fanned out in sub-directories.
+    Writes go through a temporary file and ``os.replace`` so concurrent
+    Streamlit workers never see partial files, and the modification time of
+    an entry is refreshed on every hit to drive LRU eviction.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_size = None
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".bin")
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def get(self, key):
+        """Return the cached audio bytes for a key, or None on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self._count("misses")
+            return None
+        try:
+            # Touch the entry so it becomes the most recently used
+            os.utime(path, None)
+        except OSError:
+            pass
+        self._count("hits")
+        return data
+
+    def put(self, key, data):
+        """Store audio bytes atomically and evict old entries if over budget"""
+        if not data or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._count("stores")
+
+        with self._lock:
+            if self._approx_size is None:
+                self._approx_size = self._scan_size()
+            else:
+                self._approx_size += len(data)
+            over_budget = self._approx_size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def _entries(self):
+        """List (mtime, size, path) for every entry currently on disk"""
+        entries = []
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    # Removed by another worker in the meantime
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _mtime, size, _path in self._entries())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits its budget"""
+        entries = sorted(self._entries())
+        total = sum(size for _mtime, size, _path in entries)
+        removed = 0
+        for _mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                removed += 1
+            except OSError:
+                pass
+            total -= size
+        with self._lock:
+            self._approx_size = total
+            self._stats["evictions"] += removed
+
+    def clear(self):
+        """Delete every cached entry"""
+        for _mtime, _size, path in self._entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._approx_size = 0
+
+    def stats(self, scan=False):
+        """Return hit/miss counters and disk usage.
+
+        The size is the running estimate kept by ``put`` and ``evict``;
+        ``scan=True`` measures the directory instead and resets the estimate.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            size = None if scan else self._approx_size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        if size is None:
+            size = self._scan_size()
+            with self._lock:
+                self._approx_size = size
+        stats["size_bytes"] = size
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """Return the process-wide audio cache configured from the environment"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            directory = os.getenv("AUDIO_CACHE_DIR", DEFAULT_CACHE_DIR)
+            max_bytes = int(os.getenv("AUDIO_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+            _default_cache = AudioCache(directory, max_bytes)
+        return _default_cache
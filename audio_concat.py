@@ -0,0 +1,253 @@
+import io
+
+from audio_processing import FADE_MS, float_to_pcm16, pcm_to_float, render
+from lazy_imports import lazy_module
+from scratch import get_scratch_space, redirect_pydub_temp_files
+from tracing import span, traced
+
+pydub = lazy_module("pydub")
+
+# MPEG audio version bits -> (name, sample rates by index, samples per Layer III frame)
+_MPEG_VERSIONS = {
+    3: ("1", (44100, 48000, 32000), 1152),
+    2: ("2", (22050, 24000, 16000), 576),
+    0: ("2.5", (11025, 12000, 8000), 576),
+}
+
+# Layer III bitrates in kbit/s by index, for MPEG-1 and MPEG-2/2.5
+_BITRATES = {
+    "1": (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    "2": (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+
+class FrameHeader:
+    """Decoded fields of a 4-byte MPEG Layer III frame header"""
+
+    def __init__(self, raw):
+        if len(raw) < 4 or raw[0] != 0xFF or (raw[1] & 0xE0) != 0xE0:
+            raise ValueError("No MPEG frame sync")
+        version_bits = (raw[1] >> 3) & 0x03
+        if version_bits not in _MPEG_VERSIONS or ((raw[1] >> 1) & 0x03) != 1:
+            raise ValueError("Only MPEG Layer III audio can be joined frame by frame")
+        self.version, sample_rates, self.samples_per_frame = _MPEG_VERSIONS[version_bits]
+        bitrate_index = raw[2] >> 4
+        sample_rate_index = (raw[2] >> 2) & 0x03
+        if bitrate_index in (0, 15) or sample_rate_index == 3:
+            raise ValueError("Unsupported bitrate or sample rate in MPEG frame")
+        self.bitrate = _BITRATES["1" if self.version == "1" else "2"][bitrate_index] * 1000
+        self.sample_rate = sample_rates[sample_rate_index]
+        self.padding = (raw[2] >> 1) & 0x01
+        self.has_crc = not (raw[1] & 0x01)
+        self.channel_mode = raw[3] >> 6
+        self.raw = bytes(raw[:4])
+
+    @property
+    def length(self):
+        """Size of the whole frame in bytes, header included"""
+        factor = 144 if self.version == "1" else 72
+        return factor * self.bitrate // self.sample_rate + self.padding
+
+    @property
+    def side_info_size(self):
+        mono = self.channel_mode == 3
+        if self.version == "1":
+            return 17 if mono else 32
+        return 9 if mono else 17
+
+    @property
+    def stream_format(self):
+        """Parameters that must match for frames to be concatenated"""
+        return (self.version, self.sample_rate, self.channel_mode == 3)
+
+
+def _skip_id3v2(data):
+    """Return the offset of the first byte after a leading ID3v2 tag"""
+    if len(data) >= 10 and bytes(data[:3]) == b"ID3":
+        size = 0
+        for byte in data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def iter_frames(data):
+    """Yield (header, start, end) for every audio frame of an MP3 file.
+
+    Leading ID3v2 tags, trailing ID3v1 tags and Xing/Info/VBRI header frames
+    are skipped, since they would describe the wrong duration once joined.
+    """
+    view = memoryview(data)
+    offset = _skip_id3v2(view)
+    first = True
+    while offset + 4 <= len(view):
+        try:
+            header = FrameHeader(view[offset:offset + 4])
+        except ValueError:
+            if first:
+                raise
+            # Trailing tag or garbage after the last frame
+            break
+        end = offset + header.length
+        if end > len(view):
+            break
+        if first:
+            first = False
+            info_offset = offset + 4 + (2 if header.has_crc else 0) + header.side_info_size
+            if bytes(view[info_offset:info_offset + 4]) in (b"Xing", b"Info") or bytes(view[offset + 36:offset + 40]) == b"VBRI":
+                offset = end
+                continue
+        yield header, offset, end
+        offset = end
+
+
+def silent_frames(template, duration_ms):
+    """Build pre-encoded silence matching a frame header.
+
+    A Layer III frame whose side information and main data are all zero
+    decodes to digital silence, so no encoder is needed.
+    """
+    header = bytes((template.raw[0], template.raw[1] | 0x01, template.raw[2] & 0xFD, template.raw[3]))
+    frame_header = FrameHeader(header)
+    frame = header + bytes(frame_header.length - 4)
+    frame_ms = 1000.0 * frame_header.samples_per_frame / frame_header.sample_rate
+    count = max(0, int(round(duration_ms / frame_ms)))
+    return frame * count
+
+
+def _gap_pauses(pause_ms, count):
+    """Expand a single pause into one per gap, or check a list of pauses"""
+    if isinstance(pause_ms, (int, float)):
+        return [pause_ms] * max(0, count - 1)
+    pauses = list(pause_ms)
+    if len(pauses) != max(0, count - 1):
+        raise ValueError("Expected one pause between each pair of segments")
+    return pauses
+
+
+@traced("concat_mp3")
+def concat_mp3(segments, pause_ms=300):
+    """Join MP3 segments frame by frame in one pass, without decoding.
+
+    ``pause_ms`` is one pause used between every segment, or a list with
+    the pause to leave after each segment but the last.
+
+    Raises ValueError if a segment is not Layer III audio or if the
+    segments do not share the same MPEG version, sample rate and channels.
+    """
+    pauses = _gap_pauses(pause_ms, len(segments))
+    parts = []
+    template = None
+    silences = {}
+    stream_format = None
+    for index, data in enumerate(segments):
+        first_header, start, end = None, None, None
+        for header, frame_start, frame_end in iter_frames(data):
+            if first_header is None:
+                first_header, start = header, frame_start
+            elif header.stream_format != first_header.stream_format:
+                raise ValueError("MP3 segment changes sample format mid-stream")
+            end = frame_end
+        if first_header is None:
+            continue
+        if stream_format is None:
+            stream_format = first_header.stream_format
+            template = first_header
+        elif first_header.stream_format != stream_format:
+            raise ValueError("MP3 segments use different sample formats")
+        if parts and pauses[index - 1] > 0:
+            pause = pauses[index - 1]
+            if pause not in silences:
+                silences[pause] = silent_frames(template, pause)
+            parts.append(silences[pause])
+        # Frames are contiguous within a file, so one slice covers all of them
+        parts.append(memoryview(data)[start:end])
+    if not parts:
+        raise ValueError("No MP3 frames found in the audio segments")
+    return b"".join(parts)
+
+
+def export(audio, **kwargs):
+    """Encode an AudioSegment with FFmpeg, returning the bytes.
+
+    pydub writes the whole PCM as a WAV file and the encoded output to
+    temporary files; they live in a scratch scope that is removed even
+    when encoding fails, and are counted against the scratch quota.
+    """
+    redirect_pydub_temp_files()
+    with get_scratch_space().scope("export") as scope:
+        scope.reserve(2 * len(audio.raw_data))
+        buffer = io.BytesIO()
+        audio.export(buffer, **kwargs)
+        return buffer.getvalue()
+
+
+@traced("concat_pcm")
+def concat_pcm(segments, pause_ms=300, output_format="mp3", postprocess=False, sample_rate=None):
+    """Decode segments and join them into one PCM buffer, then encode the result.
+
+    Used when segments cannot be joined frame by frame, or when
+    ``postprocess`` asks for silence trimming, loudness normalization and
+    crossfades (see ``audio_processing.render``). ``sample_rate`` resamples
+    the result. Requires FFmpeg for decoding and for encoding the result.
+    """
+    pauses = _gap_pauses(pause_ms, len(segments))
+    decoded, gaps = [], []
+    with span("decode"):
+        for index, data in enumerate(segments):
+            if data:
+                if decoded:
+                    gaps.append(pauses[index - 1])
+                decoded.append(pydub.AudioSegment.from_file(io.BytesIO(data)))
+    if not decoded:
+        raise ValueError("No audio segments to join")
+    frame_rate = max(audio.frame_rate for audio in decoded)
+    channels = max(audio.channels for audio in decoded)
+    with span("render", postprocess=postprocess):
+        arrays = [
+            pcm_to_float(audio.set_frame_rate(frame_rate).set_channels(channels).raw_data, audio.sample_width, channels)
+            for audio in decoded
+        ]
+        output = render(arrays, frame_rate, gaps, target_rate=sample_rate, trim=postprocess, normalize=postprocess,
+                        fade_ms=FADE_MS if postprocess else 0)
+    combined = pydub.AudioSegment(
+        data=float_to_pcm16(output),
+        sample_width=2,
+        frame_rate=sample_rate or frame_rate,
+        channels=channels,
+    )
+    with span("export", format=output_format):
+        return export(combined, format=output_format)
+
+
+def join_audio(segments, pause_ms=300, pcm_fallback=True, postprocess=False, sample_rate=None):
+    """Join audio segments with pauses between them.
+
+    Without post-processing the frame-level path is preferred; with it (or
+    when the frame-level join fails and ``pcm_fallback`` is set) segments are
+    decoded and joined by ``concat_pcm``.
+    """
+    if not postprocess:
+        try:
+            return concat_mp3(segments, pause_ms)
+        except ValueError:
+            if not pcm_fallback:
+                raise
+    return concat_pcm(segments, pause_ms, postprocess=postprocess, sample_rate=sample_rate)
+
+
+def transcode(data, output_format, codec=None, bitrate=None, channels=None, sample_rate=None):
+    """Re-encode audio, e.g. to a lower MP3 bitrate or to Opus in an Ogg container.
+
+    ``channels`` and ``sample_rate`` downmix and resample before encoding.
+    Requires FFmpeg for decoding and encoding.
+    """
+    with span("decode"):
+        audio = pydub.AudioSegment.from_file(io.BytesIO(data))
+    if channels:
+        audio = audio.set_channels(channels)
+    if sample_rate:
+        audio = audio.set_frame_rate(sample_rate)
+    with span("export", format=codec or output_format):
+        return export(audio, format=output_format, codec=codec, bitrate=bitrate)
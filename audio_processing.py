@@ -0,0 +1,167 @@
+from lazy_imports import lazy_module
+
+np = lazy_module("numpy")
+
+# Pause after a piece of speech, chosen from the punctuation it ends with.
+# Pieces cut mid-sentence because they were too long get a barely audible gap.
+QUESTION_ENDINGS = '?!？！؟'
+SENTENCE_ENDINGS = '.。．…۔'
+CLAUSE_ENDINGS = ',;:，、；：'
+QUESTION_PAUSE_MS = 400
+SENTENCE_PAUSE_MS = 320
+CLAUSE_PAUSE_MS = 180
+CONTINUATION_PAUSE_MS = 60
+TRAILING_CLOSERS = '"\'”’»)]」』）'
+
+# Post-processing defaults: silence below TRIM_THRESHOLD_DB is trimmed from
+# both ends of every segment (keeping TRIM_KEEP_MS), each segment is brought
+# to TARGET_DBFS with at most MAX_GAIN_DB of boost, and FADE_MS ramps (or
+# crossfades, when pauses are shorter) smooth the joins.
+WINDOW_MS = 10
+TRIM_THRESHOLD_DB = -45
+TRIM_KEEP_MS = 30
+TARGET_DBFS = -20
+MAX_GAIN_DB = 12
+FADE_MS = 15
+PEAK_LIMIT = 0.98
+
+_INT16_SCALE = 32768.0
+
+
+def pause_after(text):
+    """Return the pause in milliseconds to leave after a piece of speech"""
+    ending = (text or '').rstrip().rstrip(TRAILING_CLOSERS)[-1:]
+    if ending and ending in QUESTION_ENDINGS:
+        return QUESTION_PAUSE_MS
+    if ending and ending in SENTENCE_ENDINGS:
+        return SENTENCE_PAUSE_MS
+    if ending and ending in CLAUSE_ENDINGS:
+        return CLAUSE_PAUSE_MS
+    return CONTINUATION_PAUSE_MS
+
+
+def computed_pauses(texts):
+    """Return the pauses between consecutive pieces of speech, one fewer than texts"""
+    return [pause_after(text) for text in list(texts)[:-1]]
+
+
+def pcm_to_float(raw_data, sample_width, channels):
+    """View interleaved integer PCM as a float32 (frames, channels) array in [-1, 1]"""
+    if sample_width == 2:
+        samples = np.frombuffer(raw_data, dtype=np.int16).astype(np.float32) / _INT16_SCALE
+    elif sample_width == 4:
+        samples = (np.frombuffer(raw_data, dtype=np.int32) / 2.0 ** 31).astype(np.float32)
+    elif sample_width == 1:
+        samples = (np.frombuffer(raw_data, dtype=np.uint8).astype(np.float32) - 128) / 128
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    return samples.reshape(-1, channels)
+
+
+def float_to_pcm16(samples):
+    """Convert a float (frames, channels) array to interleaved 16-bit PCM bytes"""
+    return (np.clip(samples, -1.0, 1.0 - 1.0 / _INT16_SCALE) * _INT16_SCALE).astype(np.int16).tobytes()
+
+
+def _window_levels(samples, frame_rate):
+    """Per-window RMS level in dBFS of a (frames, channels) array, and the window size"""
+    window = max(1, frame_rate * WINDOW_MS // 1000)
+    count = len(samples) // window
+    if count == 0:
+        return np.zeros(0, dtype=np.float32), window
+    frames = samples[:count * window].reshape(count, -1)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(rms + 1e-10), window
+
+
+def trim_bounds(samples, frame_rate, threshold_db=TRIM_THRESHOLD_DB, keep_ms=TRIM_KEEP_MS):
+    """Return the (start, end) frame range left once leading and trailing silence is trimmed"""
+    levels, window = _window_levels(samples, frame_rate)
+    loud = np.flatnonzero(levels > threshold_db)
+    if len(loud) == 0:
+        return 0, 0
+    keep = frame_rate * keep_ms // 1000
+    start = max(0, loud[0] * window - keep)
+    end = min(len(samples), (loud[-1] + 1) * window + keep)
+    return int(start), int(end)
+
+
+def loudness_dbfs(samples, frame_rate, threshold_db=TRIM_THRESHOLD_DB):
+    """RMS loudness in dBFS over the windows that are not silence"""
+    levels, _ = _window_levels(samples, frame_rate)
+    voiced = levels[levels > threshold_db]
+    if len(voiced) == 0:
+        return None
+    # Average power, not decibels, so short loud words weigh what they should
+    return float(10 * np.log10(np.mean(10 ** (voiced / 10))))
+
+
+def resample(samples, source_rate, target_rate):
+    """Resample a (frames, channels) array with a band-limited FFT, in one pass"""
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    count = int(round(len(samples) * target_rate / source_rate))
+    spectrum = np.fft.rfft(samples, axis=0)
+    bins = count // 2 + 1
+    resized = np.zeros((bins, samples.shape[1]), dtype=spectrum.dtype)
+    kept = min(bins, len(spectrum))
+    resized[:kept] = spectrum[:kept]
+    return (np.fft.irfft(resized, n=count, axis=0) * (count / len(samples))).astype(np.float32)
+
+
+def _ramp(length):
+    return np.linspace(0.0, 1.0, length, endpoint=False, dtype=np.float32)[:, None]
+
+
+def render(segments, frame_rate, pauses_ms, target_rate=None, target_dbfs=TARGET_DBFS, fade_ms=FADE_MS,
+           trim=True, normalize=True):
+    """Join float (frames, channels) segments into one processed buffer.
+
+    Silence is trimmed and loudness measured per segment, then every segment
+    is written once, with its gain and fades applied, into a buffer allocated
+    for the whole result; pauses are left as zeros and pauses shorter than
+    the fade become crossfades. Resampling and peak limiting then run once
+    over the joined buffer.
+    """
+    if not segments:
+        raise ValueError("No audio segments to process")
+    if len(pauses_ms) != len(segments) - 1:
+        raise ValueError("Expected one pause between each pair of segments")
+    channels = segments[0].shape[1]
+    fade = frame_rate * fade_ms // 1000
+
+    # Analysis pass: trimmed ranges, gains and where each segment lands
+    placements = []
+    position = 0
+    for index, samples in enumerate(segments):
+        start, end = trim_bounds(samples, frame_rate) if trim else (0, len(samples))
+        if end <= start:
+            continue
+        gain = 1.0
+        if normalize:
+            level = loudness_dbfs(samples[start:end], frame_rate)
+            if level is not None:
+                gain = 10 ** (min(target_dbfs - level, MAX_GAIN_DB) / 20)
+        if placements:
+            pause = frame_rate * pauses_ms[index - 1] // 1000
+            # Overlap the previous segment by whatever part of the fade the pause does not cover
+            overlap = min(max(0, fade - pause), end - start, placements[-1][2] - placements[-1][1])
+            position += pause - overlap
+        placements.append((samples, start, end, position, gain))
+        position += end - start
+
+    output = np.zeros((position, channels), dtype=np.float32)
+    for samples, start, end, offset, gain in placements:
+        piece = samples[start:end] * np.float32(gain)
+        edge = min(fade, len(piece) // 2)
+        if edge:
+            piece[:edge] *= _ramp(edge)
+            piece[-edge:] *= _ramp(edge)[::-1]
+        output[offset:offset + len(piece)] += piece
+
+    if target_rate:
+        output = resample(output, frame_rate, target_rate)
+    peak = float(np.max(np.abs(output))) if len(output) else 0.0
+    if peak > PEAK_LIMIT:
+        output *= np.float32(PEAK_LIMIT / peak)
+    return output
@@ -0,0 +1,128 @@
+import contextlib
+import threading
+from xml.sax.saxutils import escape, quoteattr
+
+from lazy_imports import lazy_module
+
+speechsdk = lazy_module("azure.cognitiveservices.speech")
+
+# Compressed formats suited to speech; the name is a SpeechSynthesisOutputFormat member
+DEFAULT_OUTPUT_FORMAT = "Audio24Khz48KBitRateMonoMp3"
+
+
+def build_ssml(sentences, voice, pause_ms=300):
+    """Build one SSML document speaking the sentences with a break between each.
+
+    ``pause_ms`` is one break length, or a list with the break after each
+    sentence but the last.
+    """
+    lang = "-".join(voice.split("-")[:2])
+    if isinstance(pause_ms, (int, float)):
+        pause_ms = [pause_ms] * (len(sentences) - 1)
+    parts = [escape(sentences[0])] if sentences else []
+    for pause, sentence in zip(pause_ms, sentences[1:]):
+        parts.append(f'<break time="{int(pause)}ms"/>{escape(sentence)}')
+    body = "".join(parts)
+    return (
+        f'<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang={quoteattr(lang)}>'
+        f'<voice name={quoteattr(voice)}>{body}</voice></speak>'
+    )
+
+
+class SynthesizerPool:
+    """Reusable SpeechSynthesizer instances for one (region, voice, output format).
+
+    Creating a SpeechConfig and SpeechSynthesizer and opening the service
+    connection is a large part of a short request, so synthesizers are
+    kept with their connection open and handed out one request at a time.
+    """
+
+    def __init__(self, key, region, voice, output_format=DEFAULT_OUTPUT_FORMAT, max_idle=4):
+        self.key = key
+        self.region = region
+        self.voice = voice
+        self.output_format = output_format
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _create(self):
+        speech_config = speechsdk.SpeechConfig(subscription=self.key, region=self.region)
+        speech_config.speech_synthesis_voice_name = self.voice
+        speech_config.set_speech_synthesis_output_format(
+            getattr(speechsdk.SpeechSynthesisOutputFormat, self.output_format))
+        # Without an audio config the audio stays in memory on the result
+        synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+        connection = speechsdk.Connection.from_speech_synthesizer(synthesizer)
+        connection.open(True)
+        return synthesizer, connection
+
+    def warm(self, count=1):
+        """Open connections ahead of the first request"""
+        with self._lock:
+            missing = max(0, min(count, self.max_idle) - len(self._idle))
+        for _ in range(missing):
+            entry = self._create()
+            with self._lock:
+                self._idle.append(entry)
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Borrow a synthesizer; it is only returned to the pool if the request succeeded"""
+        with self._lock:
+            entry = self._idle.pop() if self._idle else None
+        if entry is None:
+            entry = self._create()
+        healthy = False
+        try:
+            yield entry[0]
+            healthy = True
+        finally:
+            with self._lock:
+                if healthy and len(self._idle) < self.max_idle:
+                    self._idle.append(entry)
+                    entry = None
+            if entry is not None:
+                entry[1].close()
+
+    def synthesize_ssml(self, ssml):
+        """Synthesize an SSML document, returning the result object from the SDK"""
+        return self._speak(lambda synthesizer: synthesizer.speak_ssml_async(ssml).get())
+
+    def _speak(self, speak):
+        with self.acquire() as synthesizer:
+            result = speak(synthesizer)
+            if result.reason == speechsdk.ResultReason.Canceled:
+                # Drop this synthesizer: its connection may be broken
+                # The error details carry the HTTP status (429, 5xx...) used to decide on retries
+                details = result.cancellation_details
+                raise RuntimeError(f"Azure synthesis canceled: {details.reason} {details.error_details or ''}".strip())
+            return result
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_synthesizer_pool(key, region, voice, output_format=DEFAULT_OUTPUT_FORMAT):
+    """Return the process-wide pool for a (credentials, region, voice, format) combination"""
+    pool_key = (key, region, voice, output_format)
+    with _pools_lock:
+        pool = _pools.get(pool_key)
+        if pool is None:
+            pool = _pools[pool_key] = SynthesizerPool(key, region, voice, output_format)
+        return pool
+
+
+def prewarm(key, region, voices, output_format=DEFAULT_OUTPUT_FORMAT):
+    """Open one connection per voice in the background"""
+    def warm_all():
+        for voice in voices:
+            try:
+                get_synthesizer_pool(key, region, voice, output_format).warm()
+            except Exception:
+                # Pre-warming is best effort, the request path reports real errors
+                pass
+    thread = threading.Thread(target=warm_all, name="azure-prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,197 @@
+"""Headless batch translation and text-to-speech.
+
+Processes a JSONL or CSV file of items without Streamlit, for example to
+pre-generate audio prompts overnight::
+
+    python batch.py prompts.jsonl --output out/ --target-lang fr --workers 8
+
+Each item is a JSON object (or CSV row) with a ``text`` field, or an
+``audio`` field pointing to a file to transcribe first, and optional
+``id``, ``source_lang`` and ``target_lang`` fields. Results are appended to
+``results.jsonl`` in the output directory as soon as each item finishes and
+audio is written under ``audio/``. Re-running the same command resumes
+from that file: items that already succeeded are skipped.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pipeline
+import tracing
+
+VOICES = {
+    "standard": pipeline.text_to_speech,
+    "enhanced": pipeline.text_to_speech_improved,
+    "premium": pipeline.text_to_speech_azure,
+    "auto": pipeline.synthesize,
+}
+
+RESULTS_FILE = "results.jsonl"
+
+
+def load_items(path):
+    """Read items from a JSONL or CSV file, giving each one a stable id"""
+    items = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    for index, row in enumerate(rows):
+        item = {key: value for key, value in row.items() if value not in (None, "")}
+        item["id"] = str(item.get("id", index))
+        items.append(item)
+    return items
+
+
+def load_checkpoint(output_dir):
+    """Return the ids of items that already completed successfully"""
+    done = set()
+    path = os.path.join(output_dir, RESULTS_FILE)
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # Last line may be truncated if the previous run crashed mid-write
+                continue
+            if result.get("status") == "ok":
+                done.add(result["id"])
+    return done
+
+
+def safe_filename(name):
+    """Item id usable as a file name: anything but letters, digits, dots and dashes becomes an underscore"""
+    return re.sub(r"[^\w.-]", "_", name).lstrip(".") or "_"
+
+
+def audio_path(output_dir, filename):
+    """Path of an audio file, refusing any name that would land outside the audio directory"""
+    audio_dir = os.path.realpath(os.path.join(output_dir, "audio"))
+    path = os.path.realpath(os.path.join(audio_dir, filename))
+    if os.path.dirname(path) != audio_dir:
+        raise ValueError(f"Invalid audio file name: {filename!r}")
+    return path
+
+
+def _write_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def process_item(item, options):
+    """Transcribe, translate and synthesize one item; runs in a worker thread or process"""
+    start_time = time.time()
+    source_lang = item.get("source_lang", options["source_lang"])
+    target_lang = item.get("target_lang", options["target_lang"])
+    result = {"id": item["id"], "source_lang": source_lang, "target_lang": target_lang}
+    try:
+        if source_lang != "auto" and source_lang not in pipeline.LANGUAGES:
+            raise ValueError(f"Unsupported source language: {source_lang!r}")
+        if target_lang not in pipeline.LANGUAGES:
+            raise ValueError(f"Unsupported target language: {target_lang!r}")
+        if "audio" in item and source_lang == "auto":
+            # Speech recognition needs the language of the recording
+            raise ValueError("Audio items need an explicit source language (source_lang or --source-lang)")
+        if "audio" in item:
+            with open(item["audio"], "rb") as f:
+                audio_bytes = f.read()
+            audio_type = os.path.splitext(item["audio"])[1].lstrip(".").lower() or None
+            text = pipeline.speech_to_text(audio_bytes, source_lang, audio_type)
+            if text.startswith("Error"):
+                raise RuntimeError(text)
+            result["original_text"] = text
+        else:
+            text = item["text"]
+
+        translated_text = pipeline.translate_text(text, target_lang, source_lang)
+        result["translated_text"] = translated_text
+
+        if not options["no_audio"]:
+            audio_bytes = VOICES[options["voice"]](translated_text, target_lang)
+            filename = f"{safe_filename(item['id'])}_{target_lang}.{pipeline.audio_format(audio_bytes)}"
+            _write_atomic(audio_path(options["output"], filename), audio_bytes)
+            result["audio_file"] = os.path.join("audio", filename)
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["process_time"] = round(time.time() - start_time, 2)
+    return result
+
+
+def run_batch(items, options, resume=True):
+    """Process items concurrently, appending each result as soon as it is ready"""
+    output_dir = options["output"]
+    os.makedirs(os.path.join(output_dir, "audio"), exist_ok=True)
+    done = load_checkpoint(output_dir) if resume else set()
+    pending = [item for item in items if item["id"] not in done]
+    if done:
+        logging.info("Resuming: %d items already done, %d to go", len(items) - len(pending), len(pending))
+
+    if options["voice"] == "premium" and not options["no_audio"]:
+        # Open Azure connections while the first items are being translated
+        pipeline.prewarm_azure({item.get("target_lang", options["target_lang"]) for item in pending})
+
+    executor_class = ProcessPoolExecutor if options["executor"] == "process" else ThreadPoolExecutor
+    counts = {"ok": 0, "error": 0}
+    with open(os.path.join(output_dir, RESULTS_FILE), "a" if resume else "w", encoding="utf-8") as results, \
+            executor_class(max_workers=options["workers"]) as executor:
+        futures = [executor.submit(process_item, item, options) for item in pending]
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.write(json.dumps(result, ensure_ascii=False) + "\n")
+            # Flush every result so a crash never loses finished work
+            results.flush()
+            os.fsync(results.fileno())
+            counts[result["status"]] += 1
+            logging.info("[%d/%d] %s: %s", i, len(pending), result["id"], result["status"])
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch translation and text-to-speech without the web UI")
+    parser.add_argument("input", help="JSONL or CSV file of items")
+    parser.add_argument("--output", "-o", default="batch_output", help="Directory for results and audio")
+    parser.add_argument("--source-lang", default="auto", help="Default source language of the items")
+    parser.add_argument("--target-lang", default="fr", choices=list(pipeline.LANGUAGES),
+                        help="Default target language of the items")
+    parser.add_argument("--voice", default="enhanced", choices=list(VOICES), help="Text-to-speech engine")
+    parser.add_argument("--no-audio", action="store_true", help="Only translate, do not synthesize audio")
+    parser.add_argument("--workers", type=int, default=4, help="Number of items processed concurrently")
+    parser.add_argument("--executor", default="thread", choices=["thread", "process"],
+                        help="Run items in threads or in separate processes")
+    parser.add_argument("--restart", action="store_true", help="Ignore previous results instead of resuming")
+    parser.add_argument("--metrics", help="Write stage latency metrics to this file at the end "
+                                          "(JSON if it ends in .json, Prometheus text otherwise; thread executor only)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    options = {
+        "output": args.output,
+        "source_lang": args.source_lang,
+        "target_lang": args.target_lang,
+        "voice": args.voice,
+        "no_audio": args.no_audio,
+        "workers": args.workers,
+        "executor": args.executor,
+    }
+    counts = run_batch(load_items(args.input), options, resume=not args.restart)
+    logging.info("Done: %d succeeded, %d failed", counts["ok"], counts["error"])
+    if args.metrics:
+        tracing.write_metrics(args.metrics)
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
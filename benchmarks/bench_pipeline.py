@@ -0,0 +1,223 @@
+"""Offline benchmark of the translation and speech pipeline against local fake services.
+
+Runs ``translate_text``, ``text_to_speech_improved``,
+``text_to_speech_azure``, the streamed translation and ``speech_to_text``
+over documents of several sizes and languages, with the upstream
+services replaced by the fakes of ``benchmarks.fakes``. Every case starts
+from an empty audio cache and translation memory. Reports throughput,
+time to first audio and peak Python memory, and compares them with a
+stored baseline::
+
+    python -m benchmarks.bench_pipeline --sizes 1 8 --langs en fr ja
+    python -m benchmarks.bench_pipeline --save-baseline
+    python -m benchmarks.bench_pipeline --check
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import pipeline
+from benchmarks.corpus import CORPUS, document
+from benchmarks.fakes import CHARS_PER_SECOND, fresh_stores, offline_services, speech_wav
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+# A metric regresses when it is worse than the baseline by this fraction and by more than the noise floor
+DEFAULT_TOLERANCE = 0.25
+NOISE_FLOOR = {"seconds": 0.02, "first_audio_s": 0.02, "peak_mb": 1.0}
+
+
+def target_for(lang):
+    return 'fr' if lang == 'en' else 'en'
+
+
+def run_translate(text, lang):
+    pipeline.translate_text(text, target_for(lang), lang)
+    return None
+
+
+def run_enhanced(text, lang):
+    start = time.perf_counter()
+    pipeline.text_to_speech_improved(text, lang)
+    return time.perf_counter() - start
+
+
+def run_azure(text, lang):
+    start = time.perf_counter()
+    pipeline.text_to_speech_azure(text, lang)
+    return time.perf_counter() - start
+
+
+def run_stream(text, lang):
+    start = time.perf_counter()
+    first_audio = None
+    for _ in pipeline.translate_and_synthesize_stream(text, target_for(lang), lang, engine="gtts"):
+        if first_audio is None:
+            first_audio = time.perf_counter() - start
+    return first_audio
+
+
+def run_speech(audio_bytes, lang):
+    pipeline.speech_to_text(audio_bytes, lang, "wav")
+    return None
+
+
+# Operation name -> function(input, lang) returning the time to first audio (None if it makes no audio)
+OPERATIONS = {
+    "translate": run_translate,
+    "tts-enhanced": run_enhanced,
+    "tts-azure": run_azure,
+    "stream": run_stream,
+    "speech-to-text": run_speech,
+}
+
+
+def case_input(operation, lang, size):
+    """Document of ``size`` copies of the language's sample, or a recording of the same length"""
+    text = document(lang, size, unique=True)
+    if operation == "speech-to-text":
+        return speech_wav(len(text) / CHARS_PER_SECOND), len(text)
+    return text, len(text)
+
+
+def measure(operation, lang, size, iterations):
+    """Median timings over ``iterations`` cold runs, then one more run under tracemalloc for peak memory"""
+    fn = OPERATIONS[operation]
+    data, chars = case_input(operation, lang, size)
+    durations, first_audio = [], []
+    for _ in range(iterations):
+        with fresh_stores():
+            start = time.perf_counter()
+            first = fn(data, lang)
+            durations.append(time.perf_counter() - start)
+        if first is not None:
+            first_audio.append(first)
+    with fresh_stores():
+        tracemalloc.start()
+        try:
+            fn(data, lang)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    seconds = statistics.median(durations)
+    return {
+        "operation": operation,
+        "lang": lang,
+        "size": size,
+        "chars": chars,
+        "seconds": round(seconds, 4),
+        "chars_per_s": round(chars / seconds, 1) if seconds else None,
+        "first_audio_s": round(statistics.median(first_audio), 4) if first_audio else None,
+        "peak_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+def run(operations, langs, sizes, iterations=3, latency_scale=1.0, error_rate=None, rate_limits=False):
+    rows = []
+    with offline_services(latency_scale, error_rate, rate_limits=rate_limits) as profiles:
+        for operation in operations:
+            for lang in langs:
+                for size in sizes:
+                    rows.append(measure(operation, lang, size, iterations))
+        calls = {name: {"calls": profile.calls, "errors": profile.errors} for name, profile in profiles.items()}
+    return rows, calls
+
+
+def case_key(row):
+    return f"{row['operation']}/{row['lang']}/{row['size']}"
+
+
+def environment(args):
+    """Settings a baseline is only comparable under"""
+    return {
+        "latency_scale": args.latency_scale,
+        "error_rate": args.error_rate,
+        "rate_limits": args.rate_limits,
+        "ffmpeg": bool(pipeline.check_ffmpeg()),
+        "audio_postprocess": pipeline.AUDIO_POSTPROCESS,
+        "python": platform.python_version(),
+    }
+
+
+def compare(rows, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return a message for every metric worse than in the baseline"""
+    previous = {case_key(row): row for row in baseline["results"]}
+    regressions = []
+    for row in rows:
+        before = previous.get(case_key(row))
+        if before is None:
+            continue
+        for metric, floor in NOISE_FLOOR.items():
+            old, new = before.get(metric), row.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append(f"{case_key(row)} {metric}: {old} -> {new} (+{(new - old) / old:.0%})"
+                                   if old else f"{case_key(row)} {metric}: {old} -> {new}")
+    return regressions
+
+
+def print_table(rows):
+    print(f"{'operation':<16}{'lang':<7}{'size':>5}{'chars':>8}{'seconds':>10}{'chars/s':>10}{'first audio':>13}{'peak MB':>9}")
+    for row in rows:
+        first_audio = row['first_audio_s'] if row['first_audio_s'] is not None else '-'
+        print(f"{row['operation']:<16}{row['lang']:<7}{row['size']:>5}{row['chars']:>8}{row['seconds']:>10}"
+              f"{row['chars_per_s']:>10}{first_audio:>13}{row['peak_mb']:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", nargs="+", default=list(OPERATIONS), choices=list(OPERATIONS))
+    parser.add_argument("--langs", nargs="+", default=["en", "fr", "ja", "ar"], choices=list(CORPUS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 8],
+                        help="Copies of the sample document per input (about 400 characters each)")
+    parser.add_argument("--iterations", type=int, default=3, help="Timed runs per case, the median is reported")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiply the simulated service latencies (0 measures pipeline overhead only)")
+    parser.add_argument("--error-rate", type=float, default=None, help="Failure rate of every fake service")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the provider rate limits")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file for --check and --save-baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit with an error if a metric regressed")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    # Engine fallbacks and retries are expected here, only errors are worth printing
+    logging.basicConfig(level=logging.ERROR)
+    rows, calls = run(args.operations, args.langs, args.sizes, args.iterations, args.latency_scale,
+                      args.error_rate, args.rate_limits)
+    print_table(rows)
+    print("fake service calls: " + ", ".join(f"{name}={count['calls']} ({count['errors']} failed)"
+                                             for name, count in calls.items()))
+    report = {"environment": environment(args), "results": rows}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+    if args.check:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != report["environment"]:
+            print(f"Warning: baseline recorded under {baseline.get('environment')}, "
+                  f"now running under {report['environment']}")
+        regressions = compare(rows, baseline, args.tolerance)
+        for message in regressions:
+            print("REGRESSION " + message)
+        if regressions:
+            return 1
+        print(f"No regression against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
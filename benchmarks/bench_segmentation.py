@@ -0,0 +1,71 @@
+"""Benchmark of sentence segmentation and request packing over the multilingual corpus.
+
+Compares the number of TTS requests per document produced by the former
+``(?<=[.!?])\\s+`` split with the script-aware segmenter and packer, and
+measures segmentation throughput::
+
+    python -m benchmarks.bench_segmentation --repeat 20
+"""
+import argparse
+import re
+import time
+
+from benchmarks.corpus import CORPUS, document
+from segmentation import ENGINE_REQUEST_CHARS, chunk_text, split_sentences
+
+
+def legacy_requests(text):
+    """Requests made per document by the previous regex split (one per sentence)"""
+    return len([sentence for sentence in re.split(r'(?<=[.!?])\s+', text) if sentence.strip()])
+
+
+def largest(chunks):
+    return max((len(chunk) for chunk in chunks), default=0)
+
+
+def run(repeat=1, engine='gtts', iterations=200):
+    rows = []
+    for lang in CORPUS:
+        text = document(lang, repeat)
+        legacy = re.split(r'(?<=[.!?])\s+', text)
+        sentences = split_sentences(text, lang)
+        chunks = chunk_text(text, lang, engine)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            chunk_text(text, lang, engine)
+        elapsed = time.perf_counter() - start
+
+        rows.append({
+            "lang": lang,
+            "chars": len(text),
+            "legacy_requests": legacy_requests(text),
+            "legacy_largest": largest(legacy),
+            "sentences": len(sentences),
+            "requests": len(chunks),
+            "largest": largest(chunks),
+            "mb_per_s": round(len(text) * iterations / elapsed / 1e6, 2),
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat each document to simulate longer inputs")
+    parser.add_argument("--engine", default="gtts", choices=list(ENGINE_REQUEST_CHARS))
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    rows = run(args.repeat, args.engine, args.iterations)
+    header = f"{'lang':<6}{'chars':>7}{'legacy req':>12}{'legacy max':>12}{'sentences':>11}{'requests':>10}{'max':>6}{'MB/s':>8}"
+    print(f"engine={args.engine} max_chars={ENGINE_REQUEST_CHARS[args.engine]} repeat={args.repeat}")
+    print(header)
+    for row in rows:
+        print(f"{row['lang']:<6}{row['chars']:>7}{row['legacy_requests']:>12}{row['legacy_largest']:>12}"
+              f"{row['sentences']:>11}{row['requests']:>10}{row['largest']:>6}{row['mb_per_s']:>8}")
+    print(f"total requests: legacy={sum(r['legacy_requests'] for r in rows)} "
+          f"packed={sum(r['requests'] for r in rows)}")
+
+
+if __name__ == "__main__":
+    main()
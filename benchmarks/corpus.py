@@ -0,0 +1,78 @@
+"""Small multilingual corpus used by the benchmarks, one document per language"""
+from segmentation import split_segments
+
+CORPUS = {
+    'en': (
+        "Welcome to the translator. Type your text in the box above. Then choose a target language. "
+        "Click the button to start. Mr. Smith tested it with 3.5 pages of notes. It worked! "
+        "Did it take long? No. Results appear below.\n\n"
+        "You can download the audio. The history tab keeps your previous translations."
+    ),
+    'fr': (
+        "Bienvenue dans le traducteur. Saisissez votre texte ci-dessus. Choisissez ensuite une langue. "
+        "Cliquez sur le bouton pour commencer. M. Dupont l'a essayé avec 3,5 pages. Ça marche ! "
+        "Est-ce long ? Non. Les résultats s'affichent en dessous.\n\n"
+        "Vous pouvez télécharger l'audio. L'onglet historique garde vos traductions."
+    ),
+    'es': (
+        "Bienvenido al traductor. Escriba su texto arriba. Luego elija un idioma. "
+        "Haga clic en el botón para empezar. El Sr. García lo probó con 3,5 páginas. ¡Funciona! "
+        "¿Tarda mucho? No. Los resultados aparecen abajo.\n\n"
+        "Puede descargar el audio. La pestaña de historial guarda sus traducciones."
+    ),
+    'de': (
+        "Willkommen beim Übersetzer. Geben Sie Ihren Text oben ein. Wählen Sie dann eine Sprache. "
+        "Klicken Sie auf die Schaltfläche. Dr. Müller hat es z.B. mit 3,5 Seiten getestet. Es funktioniert! "
+        "Dauert es lange? Nein. Die Ergebnisse erscheinen unten.\n\n"
+        "Sie können das Audio herunterladen. Der Verlauf speichert Ihre Übersetzungen."
+    ),
+    'it': (
+        "Benvenuto nel traduttore. Scrivi il testo qui sopra. Poi scegli una lingua. "
+        "Fai clic sul pulsante per iniziare. Il Sig. Rossi l'ha provato con 3,5 pagine. Funziona! "
+        "Ci vuole molto? No. I risultati appaiono qui sotto.\n\n"
+        "Puoi scaricare l'audio. La cronologia conserva le tue traduzioni."
+    ),
+    'pt': (
+        "Bem-vindo ao tradutor. Digite seu texto acima. Depois escolha um idioma. "
+        "Clique no botão para começar. O Sr. Silva testou com 3,5 páginas. Funciona! "
+        "Demora muito? Não. Os resultados aparecem abaixo.\n\n"
+        "Você pode baixar o áudio. O histórico guarda suas traduções."
+    ),
+    'ru': (
+        "Добро пожаловать в переводчик. Введите текст выше. Затем выберите язык. "
+        "Нажмите кнопку, чтобы начать. Мы проверили его на 3,5 страницах. Работает! "
+        "Это долго? Нет. Результаты появятся ниже.\n\n"
+        "Вы можете скачать аудио. Вкладка истории хранит ваши переводы."
+    ),
+    'ja': (
+        "翻訳ツールへようこそ。上の欄にテキストを入力してください。次に言語を選びます。"
+        "ボタンを押すと開始します。3.5ページのメモで試しました。うまくいきました！"
+        "時間はかかりますか？いいえ。結果は下に表示されます。\n\n"
+        "音声をダウンロードできます。履歴タブに以前の翻訳が残ります。"
+    ),
+    'zh-cn': (
+        "欢迎使用翻译工具。请在上方输入文字。然后选择目标语言。"
+        "点击按钮开始。我们用3.5页的笔记测试过。效果很好！"
+        "需要很久吗？不需要。结果会显示在下方。\n\n"
+        "您可以下载音频。历史标签会保存您以前的翻译。"
+    ),
+    'ar': (
+        "مرحبا بك في المترجم. اكتب النص في الأعلى. ثم اختر اللغة. "
+        "انقر على الزر للبدء. جربناه على 3.5 صفحات. إنه يعمل! "
+        "هل يستغرق وقتا طويلا؟ لا. تظهر النتائج في الأسفل.\n\n"
+        "يمكنك تنزيل الصوت. يحتفظ سجل الترجمة بترجماتك السابقة."
+    ),
+}
+
+
+def document(lang, repeat=1, unique=False):
+    """Return the sample document of a language, repeated to build longer inputs.
+
+    With ``unique`` every sentence of a copy is tagged with the copy number,
+    so caches and the translation memory cannot serve the repeats.
+    """
+    if not unique:
+        return "\n\n".join([CORPUS[lang]] * repeat)
+    segments = split_segments(CORPUS[lang], lang)
+    copies = ["".join(f"§{copy} {segment}{separator}" for segment, separator in segments) for copy in range(1, repeat + 1)]
+    return "\n\n".join(copy.rstrip() for copy in copies)
@@ -0,0 +1,299 @@
+"""Local stand-ins for the upstream services, so the pipeline can be benchmarked offline.
+
+Each fake reproduces the interface the pipeline uses (googletrans'
+async Translator, gTTS, the Azure Speech SDK synthesizer and
+speech_recognition's Recognizer) with a configurable latency, error
+rate and audio payload. ``offline_services`` swaps them in for the lazy
+modules of ``pipeline``, ``azure_tts`` and ``speech_chunks``::
+
+    with offline_services(latency_scale=0.5, error_rate=0.05):
+        pipeline.text_to_speech_improved(text, "en")
+"""
+import asyncio
+import contextlib
+import functools
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+import azure_tts
+import pipeline
+import speech_chunks
+from audio_cache import AudioCache
+from audio_concat import FrameHeader, iter_frames, silent_frames
+from providers import reset_providers
+from result_memo import ResultMemo
+from translation_memory import TranslationMemory
+
+# Characters of text spoken per second, to size synthesized audio and transcripts
+CHARS_PER_SECOND = 15
+
+
+class ServiceProfile:
+    """Simulated behaviour of one service: latency of a call and how often it fails.
+
+    A call takes ``latency + per_unit * units`` seconds (units are
+    characters, or seconds of audio for recognition), varied by up to
+    ``jitter`` either way, and fails with a rate-limit or server error
+    with probability ``error_rate``.
+    """
+
+    def __init__(self, latency, per_unit=0.0, jitter=0.2, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.per_unit = per_unit
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def scaled(self, factor, error_rate=None):
+        return ServiceProfile(self.latency * factor, self.per_unit * factor, self.jitter,
+                              self.error_rate if error_rate is None else error_rate)
+
+    def draw(self, units):
+        """Count one call and return (delay in seconds, whether it fails)"""
+        with self._lock:
+            self.calls += 1
+            delay = (self.latency + self.per_unit * units) * (1 + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return max(0.0, delay), failed
+
+
+# Defaults in the range of what the real services answer in for short requests
+DEFAULT_PROFILES = {
+    "translate": ServiceProfile(0.08, per_unit=0.00002),
+    "gtts": ServiceProfile(0.1, per_unit=0.002),
+    "azure": ServiceProfile(0.15, per_unit=0.0002),
+    "recognize": ServiceProfile(0.2, per_unit=0.05),
+}
+
+
+class ServiceError(Exception):
+    """HTTP error of a fake service, carrying its status like the real clients' errors"""
+
+    def __init__(self, status_code):
+        super().__init__(f"{status_code} {'Too Many Requests' if status_code == 429 else 'Service Unavailable'}")
+        self.status_code = status_code
+
+
+def _failure(profile):
+    return ServiceError(429 if profile.errors % 2 else 503)
+
+
+def _mp3_header(bitrate):
+    """Frame header of a 24 kHz mono MPEG-2 Layer III stream at one of the MPEG-2 bitrates"""
+    bitrate_index = {8: 1, 16: 2, 24: 3, 32: 4, 40: 5, 48: 6, 56: 7, 64: 8}[bitrate]
+    return FrameHeader(bytes((0xFF, 0xF3, (bitrate_index << 4) | (1 << 2), 0xC4)))
+
+
+@functools.lru_cache(maxsize=None)
+def _tone_frames(bitrate):
+    """One second of a tone encoded as MP3 frames, or None without FFmpeg"""
+    if not pipeline.check_ffmpeg():
+        return None
+    import pydub
+    t = np.arange(24000) / 24000
+    samples = (0.3 * np.sin(2 * np.pi * 220 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t)) * 32767).astype(np.int16)
+    tone = pydub.AudioSegment(samples.tobytes(), sample_width=2, frame_rate=24000, channels=1)
+    buffer = io.BytesIO()
+    tone.export(buffer, format="mp3", bitrate=f"{bitrate}k", parameters=["-ar", "24000"])
+    data = buffer.getvalue()
+    return [data[start:end] for _, start, end in iter_frames(data)]
+
+
+def mp3_payload(seconds, bitrate=32):
+    """MP3 audio of about ``seconds`` length, shaped like what the TTS services return.
+
+    With FFmpeg the frames carry a tone, so trimming and loudness
+    normalization have real signal to work on; without it they are
+    pre-encoded silence, which is enough for the frame-level join.
+    """
+    frames = _tone_frames(bitrate)
+    if frames is None:
+        return silent_frames(_mp3_header(bitrate), seconds * 1000)
+    count = max(1, int(round(seconds * len(frames))))
+    return b"".join(frames[index % len(frames)] for index in range(count))
+
+
+def speech_wav(seconds, frame_rate=16000, seed=0):
+    """WAV recording of bursts of noise separated by pauses, the shape recognition chunking expects"""
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * frame_rate), dtype=np.float32)
+    position = 0
+    while position < len(samples):
+        burst = int(rng.uniform(1.5, 4.0) * frame_rate)
+        end = min(len(samples), position + burst)
+        samples[position:end] = rng.normal(0, 0.2, end - position)
+        position = end + int(rng.uniform(0.4, 0.8) * frame_rate)
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+    header = (b"RIFF" + (36 + len(pcm)).to_bytes(4, "little") + b"WAVEfmt " + (16).to_bytes(4, "little")
+              + (1).to_bytes(2, "little") + (1).to_bytes(2, "little") + frame_rate.to_bytes(4, "little")
+              + (frame_rate * 2).to_bytes(4, "little") + (2).to_bytes(2, "little") + (16).to_bytes(2, "little")
+              + b"data" + len(pcm).to_bytes(4, "little"))
+    return header + pcm
+
+
+def fake_text(seconds, lang):
+    """Placeholder transcript of about the length spoken in ``seconds``"""
+    return " ".join([f"{lang}-word"] * max(1, int(seconds * CHARS_PER_SECOND / 8)))
+
+
+class FakeTranslator:
+    """googletrans 4 ``Translator``: an async ``translate`` of a string or a list of strings"""
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    async def translate(self, text, dest='en', src='auto'):
+        texts = text if isinstance(text, list) else [text]
+        delay, failed = self.profile.draw(sum(len(item) for item in texts))
+        await asyncio.sleep(delay)
+        if failed:
+            raise _failure(self.profile)
+        results = [SimpleNamespace(text=f"[{dest}] {item}", src=src, dest=dest) for item in texts]
+        return results if isinstance(text, list) else results[0]
+
+
+class FakeGTTS:
+    """``gtts.gTTS``: one HTTP request per object, writing MP3 to a file object"""
+
+    def __init__(self, profile, text, lang='en'):
+        self.profile = profile
+        self.text = text
+        self.lang = lang
+
+    def write_to_fp(self, fp):
+        delay, failed = self.profile.draw(len(self.text))
+        time.sleep(delay)
+        if failed:
+            raise _failure(self.profile)
+        fp.write(mp3_payload(len(self.text) / CHARS_PER_SECOND, bitrate=32))
+
+
+class FakeSynthesizer:
+    """Azure ``SpeechSynthesizer`` answering SSML documents with 48 kbit/s MP3"""
+
+    def __init__(self, profile, reasons):
+        self.profile = profile
+        self.reasons = reasons
+
+    def speak_ssml_async(self, ssml):
+        return SimpleNamespace(get=lambda: self._speak(ssml))
+
+    def _speak(self, document):
+        delay, failed = self.profile.draw(len(document))
+        time.sleep(delay)
+        if failed:
+            error = _failure(self.profile)
+            return SimpleNamespace(reason=self.reasons.Canceled, audio_data=b"",
+                                   cancellation_details=SimpleNamespace(reason="Error", error_details=str(error)))
+        # Markup is roughly a third of an SSML document, the rest is spoken
+        seconds = len(document) * 0.66 / CHARS_PER_SECOND
+        return SimpleNamespace(reason=self.reasons.SynthesizingAudioCompleted, audio_data=mp3_payload(seconds, bitrate=48))
+
+
+def fake_speech_sdk(profile):
+    """Namespace with the parts of ``azure.cognitiveservices.speech`` used by ``azure_tts``"""
+    reasons = SimpleNamespace(SynthesizingAudioCompleted="SynthesizingAudioCompleted", Canceled="Canceled")
+
+    class SpeechConfig:
+        def __init__(self, subscription=None, region=None):
+            self.speech_synthesis_voice_name = None
+
+        def set_speech_synthesis_output_format(self, output_format):
+            self.output_format = output_format
+
+    connection = SimpleNamespace(open=lambda for_continuous_recognition: None, close=lambda: None)
+    return SimpleNamespace(
+        SpeechConfig=SpeechConfig,
+        SpeechSynthesizer=lambda speech_config, audio_config=None: FakeSynthesizer(profile, reasons),
+        Connection=SimpleNamespace(from_speech_synthesizer=lambda synthesizer: connection),
+        SpeechSynthesisOutputFormat=SimpleNamespace(**{name: name for name in (
+            azure_tts.DEFAULT_OUTPUT_FORMAT, pipeline.AZURE_OUTPUT_FORMAT)}),
+        ResultReason=reasons,
+    )
+
+
+class UnknownValueError(Exception):
+    """speech_recognition's error for audio without recognizable speech"""
+
+
+class FakeAudioData:
+    def __init__(self, frame_data, sample_rate, sample_width):
+        self.frame_data = frame_data
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+
+
+def fake_speech_recognition(profile):
+    """Namespace with the parts of ``speech_recognition`` used by ``speech_chunks``"""
+
+    class Recognizer:
+        def recognize_google(self, audio_data, language='en-US'):
+            seconds = len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width)
+            delay, failed = profile.draw(seconds)
+            time.sleep(delay)
+            if failed:
+                raise _failure(profile)
+            return fake_text(seconds, language)
+
+    return SimpleNamespace(Recognizer=Recognizer, AudioData=FakeAudioData, UnknownValueError=UnknownValueError)
+
+
+@contextlib.contextmanager
+def offline_services(latency_scale=1.0, error_rate=None, profiles=None, rate_limits=False):
+    """Replace every upstream service with a local fake for the duration of the block.
+
+    ``latency_scale`` multiplies the simulated latencies (0 measures the
+    pipeline's own overhead) and ``error_rate`` overrides the failure rate
+    of every service. Provider rate limits are lifted unless
+    ``rate_limits`` is set. Yields the profiles, whose ``calls`` and
+    ``errors`` count what each fake served.
+    """
+    profiles = {name: profile.scaled(latency_scale, error_rate)
+                for name, profile in {**DEFAULT_PROFILES, **(profiles or {})}.items()}
+    translator = FakeTranslator(profiles["translate"])
+    speech_sdk = fake_speech_sdk(profiles["azure"])
+    with contextlib.ExitStack() as stack:
+        patch = lambda target, name, value: stack.enter_context(mock.patch.object(target, name, value))
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, name="offline-translation-loop", daemon=True).start()
+        stack.callback(loop.call_soon_threadsafe, loop.stop)
+        patch(pipeline, "translation_client", lambda: (loop, translator))
+        patch(pipeline, "googletrans", SimpleNamespace(Translator=lambda: translator))
+        patch(pipeline, "gtts", SimpleNamespace(gTTS=functools.partial(FakeGTTS, profiles["gtts"])))
+        patch(pipeline, "speechsdk", speech_sdk)
+        patch(azure_tts, "speechsdk", speech_sdk)
+        patch(azure_tts, "_pools", {})
+        patch(speech_chunks, "sr", fake_speech_recognition(profiles["recognize"]))
+        stack.enter_context(mock.patch.dict(os.environ, {"AZURE_SPEECH_KEY": "offline", "AZURE_SPEECH_REGION": "local"}))
+        if not rate_limits:
+            for name in ("TRANSLATE_RATE_LIMIT", "GTTS_RATE_LIMIT", "AZURE_RATE_LIMIT"):
+                patch(pipeline, name, 0)
+        reset_providers()
+        stack.callback(reset_providers)
+        yield profiles
+
+
+@contextlib.contextmanager
+def fresh_stores():
+    """Give the pipeline an empty audio cache, translation memory and result memo, so every run does the full work"""
+    with tempfile.TemporaryDirectory(prefix="tts-bench-") as directory:
+        cache = AudioCache(os.path.join(directory, "audio"))
+        memory = TranslationMemory(os.path.join(directory, "memory.sqlite3"))
+        results = ResultMemo()
+        with mock.patch.object(pipeline, "get_audio_cache", lambda: cache), \
+                mock.patch.object(pipeline, "get_translation_memory", lambda: memory), \
+                mock.patch.object(pipeline, "get_result_memo", lambda: results):
+            yield
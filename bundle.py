@@ -0,0 +1,49 @@
+import hashlib
+import io
+import json
+import zipfile
+from datetime import datetime, timezone
+
+from pipeline import LANGUAGES, audio_format
+
+MANIFEST_NAME = "manifest.json"
+
+
+def _audio_entry(archive, name, audio_bytes):
+    """Store one audio file in the archive and describe it for the manifest"""
+    filename = f"{name}.{audio_format(audio_bytes)}"
+    # Audio is already compressed, deflating it again only costs time
+    archive.writestr(filename, audio_bytes, compress_type=zipfile.ZIP_STORED)
+    return {"audio": filename, "bytes": len(audio_bytes), "sha256": hashlib.sha256(audio_bytes).hexdigest()}
+
+
+def make_bundle(result, encode=None):
+    """ZIP of a multi-language result: one audio file per language and a JSON manifest.
+
+    ``result`` is what ``translate_to_many`` or ``speech_to_many`` return;
+    ``encode`` converts every audio file before it is stored (for example
+    to the delivery encoding). The manifest lists the texts and files of
+    every language, and the targets that failed with their error.
+    """
+    encode = encode or (lambda audio_bytes: audio_bytes)
+    source_lang = result["source_lang"]
+    manifest = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "engine": result.get("engine"),
+        "source": {"lang": source_lang, "language": LANGUAGES.get(source_lang, source_lang),
+                   "text": result["original_text"]},
+        "targets": [],
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        if result.get("original_audio"):
+            manifest["source"].update(_audio_entry(archive, f"original_{source_lang}", encode(result["original_audio"])))
+        for lang, target in result["targets"].items():
+            entry = {"lang": lang, "language": LANGUAGES.get(lang, lang), "text": target["translated_text"]}
+            if target["translated_audio"]:
+                entry.update(_audio_entry(archive, f"translated_{lang}", encode(target["translated_audio"])))
+            if target["error"]:
+                entry["error"] = target["error"]
+            manifest["targets"].append(entry)
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2))
+    return buffer.getvalue()
@@ -0,0 +1,244 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from tracing import propagate, span
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest latency sample in the moving average
+EWMA_ALPHA = 0.3
+# Recent latencies kept per engine to estimate its 95th percentile
+LATENCY_WINDOW = 50
+# Samples needed before the 95th percentile is trusted for hedging
+MIN_HEDGE_SAMPLES = 5
+# Consecutive failures that take an engine out of rotation, and for how long
+FAILURE_THRESHOLD = 3
+COOLDOWN_SECONDS = 30
+# Latencies are compared per 100 characters of input, shorter requests count as one unit
+UNIT_CHARS = 100
+
+
+# State of the engine call running in the current context
+_current_call = contextvars.ContextVar("engine_call", default=None)
+
+
+class EngineUnavailable(Exception):
+    """Raised when no engine of a kind can serve a request"""
+
+
+def served_from_cache():
+    """Tell the registry the running engine call was answered from a cache.
+
+    Its latency says nothing about the engine, so it is not recorded and
+    does not pull the moving average or the hedging percentile down.
+    """
+    call = _current_call.get()
+    if call is not None:
+        call["cached"] = True
+
+
+class EngineStats:
+    """Latency and health of one engine, safe to update from several threads"""
+
+    def __init__(self):
+        self.ewma = None
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, seconds_per_unit):
+        with self._lock:
+            self.calls += 1
+            self.consecutive_failures = 0
+            self.down_until = 0.0
+            self.samples.append(seconds_per_unit)
+            if self.ewma is None:
+                self.ewma = seconds_per_unit
+            else:
+                self.ewma = EWMA_ALPHA * seconds_per_unit + (1 - EWMA_ALPHA) * self.ewma
+
+    def record_failure(self):
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= FAILURE_THRESHOLD:
+                # After the cooldown one request is let through again to probe the engine
+                self.down_until = time.monotonic() + COOLDOWN_SECONDS
+
+    def healthy(self):
+        return time.monotonic() >= self.down_until
+
+    def p95(self):
+        """95th percentile of recent latencies per unit, or None without enough samples"""
+        with self._lock:
+            if len(self.samples) < MIN_HEDGE_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+class Engine:
+    """A named provider of one kind of work ("tts", "translate"...) behind a common call signature"""
+
+    def __init__(self, name, kind, fn, available=None):
+        self.name = name
+        self.kind = kind
+        self.fn = fn
+        self.available = available or (lambda: True)
+        self.stats = EngineStats()
+
+    def usable(self):
+        return self.stats.healthy() and self.available()
+
+
+def _units(size):
+    return max(1.0, (size or 0) / UNIT_CHARS)
+
+
+class EngineRegistry:
+    """Engines by kind, routed by measured latency and health.
+
+    ``call`` tries the preferred engine first (when it is usable), then the
+    other usable engines from fastest to slowest; engines that were never
+    measured are tried after measured ones, in registration order. Engine
+    functions report failures by raising, which moves the call on to the
+    next engine. In hedged mode, a request still running after the
+    engine's 95th percentile latency is also sent to the next engine and
+    the first successful answer wins.
+    """
+
+    def __init__(self):
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, kind, fn, available=None):
+        with self._lock:
+            self._engines[name] = Engine(name, kind, fn, available)
+        return self._engines[name]
+
+    def route(self, kind, preferred=None):
+        """Return the usable engines of a kind in the order they should be tried"""
+        with self._lock:
+            engines = [engine for engine in self._engines.values() if engine.kind == kind]
+        usable = [engine for engine in engines if engine.usable()]
+        # An engine without a successful call has no latency yet; it only comes after the measured ones
+        ordered = sorted(usable, key=lambda engine: (engine.stats.ewma is None, engine.stats.ewma or 0.0))
+        for engine in ordered:
+            if engine.name == preferred:
+                ordered.remove(engine)
+                ordered.insert(0, engine)
+                break
+        return ordered
+
+    def _invoke(self, engine, args, size):
+        start = time.perf_counter()
+        call = {"cached": False}
+        token = _current_call.set(call)
+        try:
+            with span("engine", engine=engine.name, kind=engine.kind):
+                result = engine.fn(*args)
+        except Exception:
+            engine.stats.record_failure()
+            raise
+        finally:
+            _current_call.reset(token)
+        if not call["cached"]:
+            engine.stats.record_success((time.perf_counter() - start) / _units(size))
+        return result
+
+    def _race(self, candidates, args, size, on_error):
+        """Try candidates in order, starting the next one early when the running one is slow.
+
+        At most two requests are in flight: a second engine is only started
+        once the running one exceeds its 95th percentile latency (or fails).
+        """
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hedge")
+        queue = list(candidates)
+        futures = {}
+        pending = set()
+        last_error = None
+
+        def launch():
+            engine = queue.pop(0)
+            future = executor.submit(propagate(self._invoke), engine, args, size)
+            futures[future] = (engine, time.monotonic())
+            pending.add(future)
+
+        try:
+            while True:
+                if not pending:
+                    if not queue:
+                        raise last_error
+                    launch()
+                timeout = None
+                if queue and len(pending) == 1:
+                    engine, started = futures[next(iter(pending))]
+                    p95 = engine.stats.p95()
+                    if p95 is not None:
+                        timeout = max(0.0, started + p95 * _units(size) - time.monotonic())
+                done, still_pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                pending.intersection_update(still_pending)
+                if not done:
+                    logger.info("Hedging %s request to %s", engine.name, queue[0].name)
+                    launch()
+                    continue
+                for future in done:
+                    engine = futures[future][0]
+                    if future.exception() is None:
+                        return engine.name, future.result()
+                    last_error = future.exception()
+                    if on_error is not None:
+                        on_error(engine.name, last_error)
+        finally:
+            # A slower request finishes in the background; its latency is still recorded
+            executor.shutdown(wait=False)
+
+    def call(self, kind, *args, preferred=None, hedge=False, size=None, on_error=None):
+        """Run a request on the best engine of a kind, returning (engine name, result).
+
+        ``size`` (characters of input) normalizes latencies across request
+        sizes. ``on_error(engine_name, exception)`` is called for every
+        engine that fails before another one is tried. Raises the last
+        error if every engine fails, or EngineUnavailable if none is usable.
+        """
+        candidates = self.route(kind, preferred)
+        if not candidates:
+            raise EngineUnavailable(f"No {kind} engine available")
+        if hedge and len(candidates) > 1:
+            return self._race(candidates, args, size, on_error)
+        last_error = None
+        for engine in candidates:
+            try:
+                return engine.name, self._invoke(engine, args, size)
+            except Exception as e:
+                last_error = e
+                if on_error is not None:
+                    on_error(engine.name, e)
+        raise last_error
+
+    def stats(self, kind=None):
+        """Return a snapshot of every engine's latency and health"""
+        with self._lock:
+            engines = [engine for engine in self._engines.values() if kind is None or engine.kind == kind]
+        snapshot = []
+        for engine in engines:
+            p95 = engine.stats.p95()
+            snapshot.append({
+                "engine": engine.name,
+                "kind": engine.kind,
+                "available": engine.available(),
+                "healthy": engine.stats.healthy(),
+                "calls": engine.stats.calls,
+                "failures": engine.stats.failures,
+                "ewma_s": round(engine.stats.ewma, 3) if engine.stats.ewma is not None else None,
+                "p95_s": round(p95, 3) if p95 is not None else None,
+            })
+        return snapshot
@@ -0,0 +1,204 @@
+import contextlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Default location and limits of the history store (overridable from the environment)
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "tts_translator_cache", "history.sqlite3")
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_TOTAL_ENTRIES = 200000
+
+_COLUMNS = ("id", "created_at", "type", "enhanced_voice", "source_lang", "target_lang",
+            "original_text", "translated_text", "process_time")
+
+
+class HistoryStore:
+    """SQLite-backed translation history, one list of entries per session id.
+
+    Entries are indexed by session together with type, voice mode, language
+    pair and time, so each filter of the History tab is an index range
+    scan, and an FTS5 index over both texts serves full-text search (with
+    a LIKE scan as fallback when SQLite is built without FTS5). Pages are
+    read on demand; nothing but the session id is kept in memory. The
+    oldest entries of a session are dropped beyond ``max_entries``, entries
+    of every session expire after ``ttl_seconds``, and the oldest ones of
+    the whole table are dropped beyond ``max_total_entries``.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_total_entries=DEFAULT_MAX_TOTAL_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_total_entries = max_total_entries
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    type TEXT NOT NULL,
+                    enhanced_voice INTEGER NOT NULL,
+                    source_lang TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    original_text TEXT NOT NULL,
+                    translated_text TEXT NOT NULL,
+                    process_time REAL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_created ON history (created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_session ON history (session_id, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_type ON history (session_id, type, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_voice ON history (session_id, enhanced_voice, created_at)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_history_langs ON history (session_id, source_lang, target_lang, created_at)")
+            self.fts = self._create_fts(conn)
+        self.prune()
+
+    @staticmethod
+    def _create_fts(conn):
+        """Create the full-text index kept in sync by triggers; False if FTS5 is not available"""
+        try:
+            conn.execute(
+                """CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+                    original_text, translated_text, content='history', content_rowid='id')"""
+            )
+        except sqlite3.OperationalError:
+            return False
+        conn.execute(
+            """CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+                INSERT INTO history_fts (rowid, original_text, translated_text)
+                VALUES (new.id, new.original_text, new.translated_text);
+            END"""
+        )
+        conn.execute(
+            """CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN
+                INSERT INTO history_fts (history_fts, rowid, original_text, translated_text)
+                VALUES ('delete', old.id, old.original_text, old.translated_text);
+            END"""
+        )
+        return True
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add(self, session_id, entry):
+        """Record one translation; ``entry`` has the keys of the History tab entries"""
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO history (session_id, created_at, type, enhanced_voice, source_lang, target_lang,
+                                        original_text, translated_text, process_time)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (session_id, entry.get("created_at", time.time()), entry["type"], int(bool(entry["enhanced_voice"])),
+                 entry["source_lang"], entry["target_lang"], entry["original_text"], entry["translated_text"],
+                 entry.get("process_time")),
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM history WHERE session_id = ?", (session_id,)).fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    """DELETE FROM history WHERE id IN (
+                        SELECT id FROM history WHERE session_id = ? ORDER BY created_at LIMIT ?)""",
+                    (session_id, count - self.max_entries),
+                )
+        self.prune()
+
+    def prune(self):
+        """Drop expired entries of every session, then the oldest ones above max_total_entries"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM history WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM history").fetchone()
+            if count > self.max_total_entries:
+                conn.execute(
+                    "DELETE FROM history WHERE id IN (SELECT id FROM history ORDER BY created_at LIMIT ?)",
+                    (count - self.max_total_entries,),
+                )
+
+    def _where(self, session_id, entry_type=None, enhanced_voice=None, language_pair=None, query=None):
+        clauses, params = ["session_id = ?"], [session_id]
+        if entry_type is not None:
+            clauses.append("type = ?")
+            params.append(entry_type)
+        if enhanced_voice is not None:
+            clauses.append("enhanced_voice = ?")
+            params.append(int(bool(enhanced_voice)))
+        if language_pair is not None:
+            clauses += ["source_lang = ?", "target_lang = ?"]
+            params += list(language_pair)
+        terms = (query or "").split()
+        if terms and self.fts:
+            # Quote every word so user input is never parsed as FTS syntax, and match prefixes
+            match = " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+            clauses.append("id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)")
+            params.append(match)
+        elif terms:
+            for term in terms:
+                clauses.append("(original_text LIKE ? ESCAPE '\\' OR translated_text LIKE ? ESCAPE '\\')")
+                pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                params += [pattern, pattern]
+        return " AND ".join(clauses), params
+
+    def count(self, session_id, **filters):
+        """Number of entries of a session matching the filters"""
+        where, params = self._where(session_id, **filters)
+        with self._connect() as conn:
+            (count,) = conn.execute(f"SELECT COUNT(*) FROM history WHERE {where}", params).fetchone()
+        return count
+
+    def page(self, session_id, limit=20, offset=0, **filters):
+        """Return one page of entries as dicts, newest first.
+
+        Filters are ``entry_type``, ``enhanced_voice``, ``language_pair`` (a
+        (source, target) tuple) and ``query`` (words searched in both texts).
+        """
+        where, params = self._where(session_id, **filters)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""SELECT {', '.join(_COLUMNS)} FROM history WHERE {where}
+                    ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?""",
+                params + [limit, offset],
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def language_pairs(self, session_id):
+        """Distinct (source, target) language pairs in a session's history"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT DISTINCT source_lang, target_lang FROM history WHERE session_id = ? ORDER BY 1, 2",
+                (session_id,),
+            ).fetchall()
+
+    def clear(self, session_id):
+        """Delete every entry of a session"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM history WHERE session_id = ?", (session_id,))
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_history_store():
+    """Return the process-wide history store configured from the environment"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = HistoryStore(
+                os.getenv("HISTORY_DB_PATH", DEFAULT_DB_PATH),
+                int(os.getenv("HISTORY_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                int(os.getenv("HISTORY_TTL", DEFAULT_TTL_SECONDS)),
+                int(os.getenv("HISTORY_MAX_TOTAL_ENTRIES", DEFAULT_MAX_TOTAL_ENTRIES)),
+            )
+        return _default_store
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Jobs processed at the same time by the whole process, and how long finished
+# jobs (and their audio) are kept for sessions to fetch
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_RETENTION_SECONDS = float(os.getenv('JOB_RETENTION_SECONDS', '3600'))
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when the job was cancelled"""
+
+
+class Job:
+    """State of one background job, updated by its worker and read by any session"""
+
+    def __init__(self, kind, stages, description=""):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.description = description
+        self.status = "queued"
+        self.stages = {name: {"state": "pending", "progress": 0.0, "seconds": None} for name in stages}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._started = {}
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        """Stop the job at a safe point if it was cancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def start_stage(self, name):
+        self.check_cancelled()
+        with self._lock:
+            self._started[name] = time.perf_counter()
+            self.stages[name]["state"] = "running"
+
+    def progress(self, name, fraction):
+        """Report how far a stage is, between 0 and 1; also a cancellation point"""
+        with self._lock:
+            self.stages[name]["progress"] = max(0.0, min(1.0, fraction))
+        self.check_cancelled()
+
+    def finish_stage(self, name):
+        with self._lock:
+            stage = self.stages[name]
+            stage["state"] = "done"
+            stage["progress"] = 1.0
+            stage["seconds"] = round(time.perf_counter() - self._started.get(name, time.perf_counter()), 2)
+
+    def snapshot(self):
+        """Copy of the job state that is safe to render while the worker keeps updating it"""
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "description": self.description,
+                "status": self.status,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "error": self.error,
+                "created": self.created,
+                "finished": self.finished,
+            }
+
+
+class JobQueue:
+    """Process-wide queue of background jobs run on a bounded worker pool.
+
+    Jobs live in the server process, not in a Streamlit session, so they
+    keep running across reruns and tab switches and any session holding a
+    job id can poll its progress and fetch its result.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, retention_seconds=JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, stages=(), description=""):
+        """Queue ``fn(job, *args)`` and return the job id right away.
+
+        The function reports progress through the job it receives and
+        returns the job's result.
+        """
+        self.prune()
+        job = Job(kind, stages, description)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args)
+        return job.id
+
+    def _run(self, job, fn, args):
+        result, error, status = None, None, "done"
+        if job.cancelled:
+            status = "cancelled"
+        else:
+            job.status = "running"
+            try:
+                result = fn(job, *args)
+            except JobCancelled:
+                status = "cancelled"
+            except Exception as e:
+                # A stage stopped by cancellation may surface as another error
+                status = "cancelled" if job.cancelled else "failed"
+                error = str(e)
+        with job._lock:
+            for stage in job.stages.values():
+                if stage["state"] in ("pending", "running") and status != "done":
+                    stage["state"] = status if stage["state"] == "running" else "skipped"
+            job.result, job.error, job.finished = result, error, time.time()
+            job.status = status
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Ask a job to stop; queued jobs never start, running ones stop at their next checkpoint"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job._cancel.set()
+        return True
+
+    def prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished < cutoff]:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0, "cancelled": 0}
+        for job in jobs:
+            counts[job.status] += 1
+        return counts
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -0,0 +1,75 @@
+import importlib
+import threading
+import time
+
+# Wall-clock cost of every lazily imported module and one-time probe, in seconds
+_timings = {"imports": {}, "probes": {}}
+_lock = threading.RLock()
+_process_started = time.time()
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access.
+
+    Heavy SDKs (Azure, pydub, speech_recognition...) are declared with
+    ``lazy_module`` at the top of a file and only paid for by the code paths
+    that actually use them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    _timings["imports"][self._name] = round(time.perf_counter() - start, 4)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name):
+    """Return a LazyModule for the given dotted module name"""
+    return LazyModule(name)
+
+
+def once(name):
+    """Decorator caching the result of a zero-argument probe for the life of the process"""
+    def decorator(probe):
+        result = []
+        probe_lock = threading.Lock()
+
+        def wrapper():
+            if not result:
+                with probe_lock:
+                    if not result:
+                        start = time.perf_counter()
+                        result.append(probe())
+                        with _lock:
+                            _timings["probes"][name] = round(time.perf_counter() - start, 4)
+            return result[0]
+
+        wrapper.__name__ = probe.__name__
+        wrapper.__doc__ = probe.__doc__
+        return wrapper
+    return decorator
+
+
+def startup_report():
+    """Return import and probe timings collected since the process started"""
+    with _lock:
+        return {
+            "process_uptime": round(time.time() - _process_started, 1),
+            "imports": dict(_timings["imports"]),
+            "probes": dict(_timings["probes"]),
+        }
@@ -0,0 +1,755 @@
+"""Translation, text-to-speech and speech-to-text pipeline.
+
+This module holds everything the Streamlit app does that does not involve
+the page itself, so it can be imported by batch jobs and scripts. User
+facing warnings go through ``notify``; the app installs a notifier that
+shows them on the page, other callers get them through ``logging``.
+"""
+import asyncio
+import hashlib
+import inspect
+import io
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from audio_cache import get_audio_cache, make_key, normalize_text
+from audio_concat import join_audio, transcode
+from audio_processing import computed_pauses
+from azure_tts import DEFAULT_OUTPUT_FORMAT, build_ssml, get_synthesizer_pool, prewarm
+from engines import EngineRegistry, EngineUnavailable, served_from_cache
+from lazy_imports import lazy_module, once
+from providers import get_provider
+from result_memo import get_result_memo, memo_key
+from speech_chunks import decode_audio, transcribe_chunks
+from segmentation import (ENGINE_REQUEST_CHARS, chunk_text, join_segments, pack_chunks, split_batches, split_segments,
+                          split_sentences)
+from task_graph import TaskError, TaskGraph
+from tracing import annotate, propagate, span, traced
+from translation_memory import get_translation_memory
+
+# Heavy SDKs are only imported by the code paths that use them
+speechsdk = lazy_module("azure.cognitiveservices.speech")
+googletrans = lazy_module("googletrans")
+gtts = lazy_module("gtts")
+
+# Load environment variables before reading any setting from them
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_notifier = None
+
+def set_notifier(notifier):
+    """Install a callable(level, message) that surfaces warnings to the user"""
+    global _notifier
+    _notifier = notifier
+
+def notify(level, message):
+    """Report a warning or error to the log and to the installed notifier"""
+    logger.log(logging.ERROR if level == "error" else logging.WARNING, message)
+    if _notifier is not None:
+        _notifier(level, message)
+
+# Check FFmpeg availability once per process
+@once("ffmpeg")
+def check_ffmpeg():
+    if shutil.which('ffmpeg') is None:
+        return False
+    try:
+        subprocess.run(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return True
+    except OSError:
+        return False
+
+# Language options with codes and display names
+LANGUAGES = {
+    'en': 'English',
+    'fr': 'French',
+    'es': 'Spanish',
+    'de': 'German',
+    'it': 'Italian',
+    'pt': 'Portuguese',
+    'ru': 'Russian',
+    'ja': 'Japanese',
+    'zh-cn': 'Chinese (Simplified)',
+    'ar': 'Arabic'
+}
+
+# Speech recognition language mapping
+SR_LANGUAGES = {
+    'en': 'en-US',
+    'fr': 'fr-FR',
+    'es': 'es-ES',
+    'de': 'de-DE',
+    'it': 'it-IT',
+    'pt': 'pt-BR',
+    'ru': 'ru-RU',
+    'ja': 'ja-JP',
+    'zh-cn': 'zh-CN',
+    'ar': 'ar-SA'
+}
+
+# Azure TTS voice mapping (more natural voices)
+AZURE_VOICES = {
+    'en': 'en-US-AriaNeural',
+    'fr': 'fr-FR-DeniseNeural',
+    'es': 'es-ES-ElviraNeural',
+    'de': 'de-DE-KatjaNeural',
+    'it': 'it-IT-ElsaNeural',
+    'pt': 'pt-BR-FranciscaNeural',
+    'ru': 'ru-RU-SvetlanaNeural',
+    'ja': 'ja-JP-NanamiNeural',
+    'zh-cn': 'zh-CN-XiaoxiaoNeural',
+    'ar': 'ar-SA-ZariyahNeural'
+}
+
+# Concurrency and retry settings for per-sentence synthesis
+TTS_MAX_WORKERS = int(os.getenv('TTS_MAX_WORKERS', '8'))
+TTS_SEGMENT_RETRIES = int(os.getenv('TTS_SEGMENT_RETRIES', '2'))
+
+# Concurrency and retry settings for chunked speech recognition
+STT_MAX_WORKERS = int(os.getenv('STT_MAX_WORKERS', '4'))
+STT_CHUNK_RETRIES = int(os.getenv('STT_CHUNK_RETRIES', '2'))
+
+# Translations and syntheses run at the same time when one input goes to several languages
+FANOUT_MAX_WORKERS = int(os.getenv('FANOUT_MAX_WORKERS', '4'))
+
+# Compressed Azure output format (a SpeechSynthesisOutputFormat name, e.g. Ogg24Khz16BitMonoOpus)
+AZURE_OUTPUT_FORMAT = os.getenv('AZURE_OUTPUT_FORMAT', DEFAULT_OUTPUT_FORMAT)
+
+# Characters of text packed into a single Azure SSML request
+AZURE_MAX_REQUEST_CHARS = int(os.getenv('AZURE_MAX_REQUEST_CHARS', ENGINE_REQUEST_CHARS['azure']))
+
+# Maximum time to wait for one translation request
+TRANSLATE_TIMEOUT = float(os.getenv('TRANSLATE_TIMEOUT', '30'))
+
+# Requests per second sent to each provider by the whole process (0 disables
+# the limit), and retries of a request that was rate limited or hit a server error
+TRANSLATE_RATE_LIMIT = float(os.getenv('TRANSLATE_RATE_LIMIT', '5'))
+GTTS_RATE_LIMIT = float(os.getenv('GTTS_RATE_LIMIT', '10'))
+AZURE_RATE_LIMIT = float(os.getenv('AZURE_RATE_LIMIT', '20'))
+PROVIDER_RETRIES = int(os.getenv('PROVIDER_RETRIES', '3'))
+
+# Send requests still running after an engine's 95th percentile latency to a second engine
+ENGINE_HEDGING = os.getenv('ENGINE_HEDGING', '0') == '1'
+
+# Trim, loudness-normalize and crossfade joined speech (needs FFmpeg), and
+# optionally resample it (0 keeps the engine's sample rate)
+AUDIO_POSTPROCESS = os.getenv('AUDIO_POSTPROCESS', '1') == '1'
+AUDIO_SAMPLE_RATE = int(os.getenv('AUDIO_SAMPLE_RATE', '0'))
+
+# Encodings offered for playback and download: the engine's own output, or a
+# compact mono re-encoding (needs FFmpeg)
+OUTPUT_ENCODINGS = {
+    'original': None,
+    'mp3-64k': {'output_format': 'mp3', 'bitrate': '64k', 'channels': 1, 'sample_rate': 24000},
+    'mp3-32k': {'output_format': 'mp3', 'bitrate': '32k', 'channels': 1, 'sample_rate': 22050},
+    'opus-32k': {'output_format': 'ogg', 'codec': 'libopus', 'bitrate': '32k', 'channels': 1, 'sample_rate': 48000},
+    'opus-16k': {'output_format': 'ogg', 'codec': 'libopus', 'bitrate': '16k', 'channels': 1, 'sample_rate': 24000},
+}
+AUDIO_OUTPUT_ENCODING = os.getenv('AUDIO_OUTPUT_ENCODING', 'original')
+
+@once("translation_client")
+def translation_client():
+    """Start the process-wide event loop and Translator used for every translation"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="translation-loop", daemon=True).start()
+    return loop, googletrans.Translator()
+
+async def translate_text_async(text, target_lang, source_lang='auto', translator=None):
+    """Async function to translate text (a string or a list of strings)"""
+    translator = translator or googletrans.Translator()
+    translation = await translator.translate(text, dest=target_lang, src=source_lang)
+    if isinstance(translation, list):
+        return [item.text for item in translation]
+    return translation.text
+
+def google_translate(segments, target_lang, source_lang='auto'):
+    """Google Translate engine, on the shared event loop so the Translator and its connections are reused"""
+    def request():
+        loop, translator = translation_client()
+        future = asyncio.run_coroutine_threadsafe(
+            translate_text_async(segments, target_lang, source_lang, translator), loop)
+        return future.result(timeout=TRANSLATE_TIMEOUT)
+    provider = get_provider("google-translate", TRANSLATE_RATE_LIMIT, PROVIDER_RETRIES)
+    return provider.call(("async", source_lang, target_lang, tuple(segments)), request)
+
+# googletrans 4.0 made translate() a coroutine; only older releases have the synchronous API
+@once("googletrans_sync")
+def googletrans_sync_available():
+    translate = getattr(googletrans.Translator, "translate", None)
+    return translate is not None and not inspect.iscoroutinefunction(translate)
+
+def google_translate_sync(segments, target_lang, source_lang='auto'):
+    """Google Translate through the synchronous API of older googletrans releases"""
+    def request():
+        translator = googletrans.Translator()
+        translation = translator.translate(segments, dest=target_lang, src=source_lang)
+        if isinstance(translation, list) and all(hasattr(item, 'text') for item in translation):
+            return [item.text for item in translation]
+        raise RuntimeError("Synchronous translation is not supported by this googletrans version")
+    provider = get_provider("google-translate", TRANSLATE_RATE_LIMIT, PROVIDER_RETRIES)
+    return provider.call(("sync", source_lang, target_lang, tuple(segments)), request)
+
+class TranslationError(Exception):
+    """Raised when text could not be translated after retries on every translation engine"""
+
+def translate_segments(segments, target_lang, source_lang='auto'):
+    """Translate a list of segments in a single upstream request"""
+    errors = []
+    
+    def record_error(engine_name, error):
+        logger.warning("Translation engine %s failed: %s", engine_name, error)
+        errors.append(f"{engine_name}: {str(error)}")
+    
+    try:
+        _, translated = engine_registry.call(
+            "translate", segments, target_lang, source_lang, hedge=ENGINE_HEDGING,
+            size=sum(len(segment) for segment in segments), on_error=record_error)
+    except Exception as e:
+        raise TranslationError(f"Translation error: {'; '.join(errors) or str(e)}") from e
+    if len(translated) != len(segments):
+        raise TranslationError("Translation error: the translator returned the wrong number of sentences")
+    return translated
+
+def translate_text(text, target_lang, source_lang='auto'):
+    """Translate text sentence by sentence, reusing segments from the translation memory.
+    
+    Raises TranslationError if the missing segments cannot be translated,
+    rather than passing the original text off as a translation.
+    """
+    segments = split_segments(text, source_lang)
+    if not segments:
+        return text
+    
+    with span("translate_text") as current:
+        memory = get_translation_memory()
+        known = memory.lookup(source_lang, target_lang, [segment for segment, _ in segments])
+        
+        # Only send segments the memory has never seen to the translator
+        missing = list(dict.fromkeys(
+            segment.strip() for segment, _ in segments if normalize_text(segment) not in known
+        ))
+        current.set(cache="hit" if not missing else "partial" if known else "miss")
+        if missing:
+            translated = translate_segments(missing, target_lang, source_lang)
+            memory.store(source_lang, target_lang, zip(missing, translated))
+            known.update((normalize_text(segment), translation) for segment, translation in zip(missing, translated))
+    
+    return join_segments([(known[normalize_text(segment)], separator) for segment, separator in segments], target_lang)
+
+def gtts_audio_bytes(text, lang, whole_request=False):
+    """Synthesize text with gTTS, serving repeated requests from the audio cache.
+    
+    Concurrent requests for the same text share one upstream call, and
+    rate-limited or failed calls are retried with backoff. With
+    ``whole_request`` the audio is the engine's entire answer, and a
+    cache hit is reported to the engine registry.
+    """
+    cache = get_audio_cache()
+    key = make_key("gtts", None, lang, text, "mp3")
+    with span("gtts_request") as current:
+        audio_bytes = cache.get(key)
+        current.set(cache="hit" if audio_bytes is not None else "miss")
+        if audio_bytes is not None:
+            if whole_request:
+                served_from_cache()
+            return audio_bytes
+        
+        def request():
+            buffer = io.BytesIO()
+            gtts.gTTS(text=text, lang=lang).write_to_fp(buffer)
+            audio_bytes = buffer.getvalue()
+            cache.put(key, audio_bytes)
+            return audio_bytes
+        return get_provider("gtts", GTTS_RATE_LIMIT, TTS_SEGMENT_RETRIES).call(key, request)
+
+def synthesize_segments(segments, lang, max_workers=TTS_MAX_WORKERS):
+    """Synthesize segments concurrently with a bounded pool, returning audio in input order"""
+    if max_workers <= 1 or len(segments) <= 1:
+        return [gtts_audio_bytes(segment, lang) for segment in segments]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(segments))) as executor:
+        # Per-sentence spans nest under the caller's span although they run on the pool
+        return list(executor.map(propagate(lambda segment: gtts_audio_bytes(segment, lang)), segments))
+
+def translate_and_synthesize_stream(text, target_lang, source_lang='auto', engine=None, hedge=None,
+                                    max_workers=TTS_MAX_WORKERS, initializer=None):
+    """Yield (translated sentence, separator, audio bytes, error) in order, each as soon as it is ready.
+    
+    Every sentence is translated and synthesized independently on a bounded pool,
+    so the first chunk only waits for the first sentence of the document. Speech
+    comes from ``engine`` like ``synthesize``. A sentence that cannot be translated
+    or synthesized is yielded with its TranslationError or SynthesisError (and
+    no translation or no audio) while the following sentences carry on.
+    """
+    segments = split_segments(text, source_lang)
+    
+    def process(segment):
+        try:
+            translated = translate_text(segment, target_lang, source_lang)
+        except TranslationError as e:
+            return None, None, e
+        try:
+            return translated, synthesize(translated, target_lang, engine, hedge=hedge), None
+        except SynthesisError as e:
+            return translated, None, e
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(segments) or 1)), initializer=initializer)
+    try:
+        futures = [(executor.submit(process, segment.strip()), separator) for segment, separator in segments]
+        for future, separator in futures:
+            translated, audio_bytes, error = future.result()
+            yield translated, separator, audio_bytes, error
+    finally:
+        # Stop pending work if the consumer goes away before the end of the document
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def audio_format(audio_bytes):
+    """Detect the container of synthesized audio ('wav', 'ogg', 'webm' or 'mp3')"""
+    magic = bytes(audio_bytes[:4])
+    if magic == b'RIFF':
+        return 'wav'
+    if magic == b'OggS':
+        return 'ogg'
+    if magic == b'\x1aE\xdf\xa3':
+        return 'webm'
+    return 'mp3'
+
+@traced("join_speech")
+def join_speech(segment_audio, texts):
+    """Join synthesized pieces of speech with pauses computed from their punctuation"""
+    ffmpeg = check_ffmpeg()
+    return join_audio(segment_audio, pause_ms=computed_pauses(texts), pcm_fallback=ffmpeg,
+                      postprocess=AUDIO_POSTPROCESS and ffmpeg, sample_rate=AUDIO_SAMPLE_RATE or None)
+
+def joined_audio_tag(fmt):
+    """Cache key format for joined speech, so changing post-processing settings invalidates it"""
+    if AUDIO_POSTPROCESS and check_ffmpeg():
+        return f"{fmt}-processed-{AUDIO_SAMPLE_RATE}"
+    return fmt
+
+def save_audio(audio_bytes, output_path):
+    """Write audio to disk, only used when a caller explicitly asks for a file"""
+    with open(output_path, 'wb') as f:
+        f.write(audio_bytes)
+
+def gtts_tts(text, lang):
+    """Standard gTTS engine: the whole text in one request"""
+    return gtts_audio_bytes(text, lang, whole_request=True)
+
+def gtts_enhanced_tts(text, lang):
+    """Enhanced gTTS engine: sentences synthesized in parallel and joined with natural pauses"""
+    # Break text at the language's sentence punctuation, packing short sentences
+    # together so each request is close to the size gTTS handles in one call
+    segments = chunk_text(text, lang, 'gtts')
+    if len(segments) <= 1:
+        # If everything fits in one request, there is nothing to join
+        return gtts_audio_bytes(text, lang, whole_request=True)
+    
+    # Reuse the combined audio if this exact text was already synthesized
+    cache = get_audio_cache()
+    combined_key = make_key("gtts-enhanced", None, lang, text, joined_audio_tag("mp3"))
+    combined_audio = cache.get(combined_key)
+    annotate(cache="hit" if combined_audio is not None else "miss")
+    if combined_audio is not None:
+        served_from_cache()
+        return combined_audio
+    
+    # Create audio for all chunks concurrently, pauses are added between them below
+    segment_audio = synthesize_segments(segments, lang)
+    
+    # Join segments with a pause fitting each sentence ending; trimming,
+    # normalization and the PCM fallback need FFmpeg to decode and encode
+    try:
+        combined_audio = join_speech(segment_audio, segments)
+    except ValueError as e:
+        if not check_ffmpeg():
+            raise RuntimeError("FFmpeg n'est pas disponible pour combiner l'audio") from e
+        raise RuntimeError(f"Erreur lors de la combinaison audio: {str(e)}") from e
+    
+    cache.put(combined_key, combined_audio)
+    return combined_audio
+
+def azure_available():
+    return bool(os.getenv('AZURE_SPEECH_KEY') and os.getenv('AZURE_SPEECH_REGION'))
+
+def azure_tts(text, lang):
+    """Azure engine: human-like neural voices through pooled synthesizers"""
+    speech_key = os.getenv('AZURE_SPEECH_KEY')
+    speech_region = os.getenv('AZURE_SPEECH_REGION')
+    if not speech_key or not speech_region:
+        raise EngineUnavailable("Azure Speech Service credentials are not set")
+    
+    # Set the voice based on the language
+    voice_name = AZURE_VOICES.get(lang, AZURE_VOICES['en'])
+    
+    # Serve repeated requests from the audio cache without calling Azure
+    cache = get_audio_cache()
+    cache_key = make_key("azure", voice_name, lang, text, joined_audio_tag(AZURE_OUTPUT_FORMAT))
+    audio_bytes = cache.get(cache_key)
+    annotate(cache="hit" if audio_bytes is not None else "miss")
+    if audio_bytes is not None:
+        served_from_cache()
+        return audio_bytes
+    
+    # Pack sentences into as few SSML requests as the size limit allows, with
+    # pauses rendered by the service instead of stitched in afterwards
+    batches = pack_chunks(split_sentences(text, lang), AZURE_MAX_REQUEST_CHARS)
+    documents = [build_ssml(batch, voice_name, pause_ms=computed_pauses(batch)) for batch in batches]
+    if not documents:
+        raise ValueError("Azure Speech synthesis failed: empty text")
+    
+    # Sessions asking for the same audio at the same time share the requests below
+    provider = get_provider("azure", AZURE_RATE_LIMIT, PROVIDER_RETRIES)
+    
+    def synthesize_all():
+        # Synthesize on pooled synthesizers whose connections are already open
+        pool = get_synthesizer_pool(speech_key, speech_region, voice_name, AZURE_OUTPUT_FORMAT)
+        def synthesize_document(document):
+            with span("azure_request"):
+                return provider.request(lambda: pool.synthesize_ssml(document))
+        if len(documents) == 1:
+            results = [synthesize_document(documents[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(TTS_MAX_WORKERS, len(documents))) as executor:
+                results = list(executor.map(propagate(synthesize_document), documents))
+        
+        failed = [result for result in results if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted]
+        if failed:
+            raise RuntimeError(f"Azure Speech synthesis failed: {failed[0].reason}")
+        
+        if len(results) == 1:
+            audio_bytes = results[0].audio_data
+        else:
+            audio_bytes = join_speech([result.audio_data for result in results],
+                                      [batch[-1] for batch in batches])
+        cache.put(cache_key, audio_bytes)
+        return audio_bytes
+    return provider.inflight.do(cache_key, synthesize_all)
+
+# Every TTS and translation provider, routed by measured latency and health
+engine_registry = EngineRegistry()
+engine_registry.register("azure", "tts", azure_tts, available=azure_available)
+engine_registry.register("gtts-enhanced", "tts", gtts_enhanced_tts)
+engine_registry.register("gtts", "tts", gtts_tts)
+engine_registry.register("google", "translate", google_translate)
+engine_registry.register("google-sync", "translate", google_translate_sync, available=googletrans_sync_available)
+
+class SynthesisError(Exception):
+    """Raised when text could not be synthesized by any speech engine"""
+
+def report_engine_error(engine_name, error):
+    notify("warning", f"{engine_name} failed: {str(error)}. Trying another engine.")
+
+def synthesize(text, lang, engine=None, output_path=None, hedge=None):
+    """Synthesize speech on the preferred engine, or the fastest healthy one.
+    
+    Falls back to the other engines if the preferred one is unavailable or
+    fails; with ``hedge`` (default ENGINE_HEDGING) slow requests are also
+    sent to the next engine. Raises SynthesisError when every engine fails.
+    """
+    with span("synthesize") as current:
+        try:
+            engine_name, audio_bytes = engine_registry.call(
+                "tts", text, lang, preferred=engine, hedge=ENGINE_HEDGING if hedge is None else hedge,
+                size=len(text), on_error=report_engine_error)
+        except Exception as e:
+            raise SynthesisError(f"Speech synthesis error: {str(e)}") from e
+        current.set(engine=engine_name)
+    if output_path:
+        save_audio(audio_bytes, output_path)
+    return audio_bytes
+
+def text_to_speech(text, lang, output_path=None):
+    """Generate speech using gTTS (standard quality), returning the audio bytes"""
+    return synthesize(text, lang, "gtts", output_path)
+
+def text_to_speech_improved(text, lang, output_path=None):
+    """Generate better quality speech by breaking text into natural phrases"""
+    return synthesize(text, lang, "gtts-enhanced", output_path)
+
+def text_to_speech_azure(text, lang, output_path=None):
+    """Generate more human-like speech using Azure Speech Service"""
+    return synthesize(text, lang, "azure", output_path)
+
+def encode_for_delivery(audio_bytes, encoding=AUDIO_OUTPUT_ENCODING):
+    """Re-encode audio for playback and download in one of OUTPUT_ENCODINGS.
+    
+    Encoded versions are cached by content. Audio is returned unchanged for
+    the 'original' encoding or when FFmpeg is not available.
+    """
+    settings = OUTPUT_ENCODINGS.get(encoding)
+    if not settings or not audio_bytes or not check_ffmpeg():
+        return audio_bytes
+    cache = get_audio_cache()
+    key = make_key("encode", encoding, None, hashlib.sha256(audio_bytes).hexdigest(), settings['output_format'])
+    with span("encode", encoding=encoding) as current:
+        encoded = cache.get(key)
+        current.set(cache="hit" if encoded is not None else "miss")
+        if encoded is None:
+            encoded = transcode(audio_bytes, **settings)
+            cache.put(key, encoded)
+    return encoded
+
+def engine_stats(kind=None):
+    """Latency and health of the registered engines"""
+    return engine_registry.stats(kind)
+
+# Voices already pre-warmed, by credentials, so page reruns do not start it again
+_prewarmed = set()
+_prewarmed_lock = threading.Lock()
+
+def prewarm_azure(langs):
+    """Open Azure connections for the voices of the given languages in the background, once per voice"""
+    speech_key = os.getenv('AZURE_SPEECH_KEY')
+    speech_region = os.getenv('AZURE_SPEECH_REGION')
+    if not speech_key or not speech_region:
+        return
+    with _prewarmed_lock:
+        voices = [voice for voice in dict.fromkeys(AZURE_VOICES.get(lang, AZURE_VOICES['en']) for lang in langs)
+                  if (speech_key, speech_region, voice) not in _prewarmed]
+        _prewarmed.update((speech_key, speech_region, voice) for voice in voices)
+    if voices:
+        prewarm(speech_key, speech_region, voices, AZURE_OUTPUT_FORMAT)
+
+def speech_to_text_segments(audio_bytes, language, audio_format=None, progress=None):
+    """Transcribe audio in silence-delimited chunks, returning timestamped segments.
+    
+    Transcripts are remembered by the hash of the audio, so the same
+    upload is not recognized again on a rerun or by another session.
+    """
+    memo = get_result_memo()
+    key = memo_key("transcript", audio_bytes, language=language, audio_format=audio_format)
+    with span("speech_to_text"):
+        segments = memo.get(key)
+        annotate(cache="hit" if segments is not None else "miss")
+        if segments is not None:
+            if progress:
+                progress(1, 1)
+            return segments
+        with span("decode_audio"):
+            audio = decode_audio(audio_bytes, audio_format)
+        segments = transcribe_chunks(audio, SR_LANGUAGES.get(language, language),
+                                     max_workers=STT_MAX_WORKERS, retries=STT_CHUNK_RETRIES, progress=progress)
+        # Chunks that failed may succeed next time
+        if not any(segment["error"] for segment in segments):
+            memo.put(key, segments)
+        return segments
+
+def transcript_text(segments):
+    """Stitch chunk transcripts in order, or describe why nothing was recognized"""
+    text = " ".join(segment["text"] for segment in segments if segment["text"])
+    if text:
+        return text
+    failed_segments = [segment for segment in segments if segment["error"]]
+    if failed_segments:
+        return f"Error recognizing audio: {failed_segments[0]['error']}"
+    return "Error recognizing audio: no speech detected"
+
+def speech_to_text(audio_bytes, language, audio_format=None):
+    """Convert speech to text using Google Speech Recognition"""
+    try:
+        return transcript_text(speech_to_text_segments(audio_bytes, language, audio_format))
+    except Exception as e:
+        return f"Error recognizing audio: {str(e)}"
+
+def fan_out_targets(source_lang, target_langs):
+    """Distinct target languages other than the source, in the order given"""
+    return [lang for lang in dict.fromkeys(target_langs) if lang != source_lang]
+
+def translate_to_many(text, source_lang, target_langs, engine=None, hedge=None, original_audio=True,
+                      max_workers=FANOUT_MAX_WORKERS, initializer=None, progress=None, should_stop=None):
+    """Translate one text into several languages and synthesize every version in one pass.
+    
+    The original is synthesized once while all targets are translated and
+    synthesized concurrently, sharing the audio cache, the translation
+    memory and the provider rate limits. A target that fails carries its
+    error instead of failing the others. ``progress(done, total)`` is
+    called as tasks finish; ``should_stop()`` is called before each task
+    starts and stops the whole fan-out by raising.
+    """
+    targets = fan_out_targets(source_lang, target_langs)
+    total = len(targets) * 2 + (1 if original_audio else 0)
+    finished = [0]
+    lock = threading.Lock()
+    
+    def counted(fn):
+        def run(*args):
+            if should_stop:
+                should_stop()
+            try:
+                return fn(*args)
+            finally:
+                with lock:
+                    finished[0] += 1
+                    done = finished[0]
+                if progress:
+                    progress(done, total)
+        return propagate(run)
+    
+    with span("fan_out"):
+        graph = TaskGraph()
+        if original_audio:
+            graph.add("original_audio", counted(lambda: synthesize(text, source_lang, engine, hedge=hedge)))
+        for lang in targets:
+            graph.add(f"translation_{lang}", counted(lambda lang=lang: translate_text(text, lang, source_lang)))
+            graph.add(f"audio_{lang}", counted(lambda translated, lang=lang: synthesize(translated, lang, engine, hedge=hedge)),
+                      deps=[f"translation_{lang}"])
+        graph.start(max_workers=max_workers, initializer=initializer)
+        
+        results = {}
+        for lang in targets:
+            entry = results[lang] = {"translated_text": None, "translated_audio": None, "error": None}
+            try:
+                entry["translated_text"] = graph.result(f"translation_{lang}")
+                entry["translated_audio"] = graph.result(f"audio_{lang}")
+            except TaskError as e:
+                # A stop request fails the tasks it interrupts; it is not an error of the target
+                if should_stop:
+                    should_stop()
+                entry["error"] = str(e.__cause__ or e)
+                logger.warning("Translation into %s failed: %s", lang, entry["error"])
+        result = {
+            "original_text": text,
+            "original_audio": graph.result("original_audio") if original_audio else None,
+            "source_lang": source_lang,
+            "engine": engine,
+            "targets": results,
+        }
+    return result
+
+def speech_to_many(audio_bytes, source_lang, target_langs, audio_format=None, engine=None, hedge=None,
+                   max_workers=FANOUT_MAX_WORKERS, initializer=None, progress=None, should_stop=None):
+    """Transcribe a recording once, then translate and synthesize the transcript into several languages"""
+    segments = speech_to_text_segments(audio_bytes, source_lang, audio_format)
+    transcribed_text = transcript_text(segments)
+    if transcribed_text.startswith("Error"):
+        raise RuntimeError(transcribed_text)
+    result = translate_to_many(transcribed_text, source_lang, target_langs, engine, hedge, original_audio=False,
+                               max_workers=max_workers, initializer=initializer, progress=progress,
+                               should_stop=should_stop)
+    # The recording itself is the original audio
+    result.update(original_audio=audio_bytes, segments=segments)
+    return result
+
+def translate_for_job(job, stage, text, target_lang, source_lang):
+    """Translate text batch by batch, reporting progress on a job stage"""
+    job.start_stage(stage)
+    batches = split_batches(text, source_lang, ENGINE_REQUEST_CHARS['translate'])
+    translated = []
+    for i, batch in enumerate(batches):
+        translated.append(translate_text(batch, target_lang, source_lang))
+        job.progress(stage, (i + 1) / len(batches))
+    job.finish_stage(stage)
+    return ''.join(translated)
+
+def synthesize_for_job(job, stage, text, lang, engine=None, hedge=None):
+    """Synthesize text batch by batch, reporting progress on a job stage"""
+    job.start_stage(stage)
+    # Batches are sized for speech engines, Azure with its configured request limit
+    max_chars = AZURE_MAX_REQUEST_CHARS if engine == "azure" else ENGINE_REQUEST_CHARS['tts']
+    batches = split_batches(text, lang, max_chars)
+    audio = []
+    for i, batch in enumerate(batches):
+        audio.append(synthesize(batch, lang, engine, hedge=hedge))
+        job.progress(stage, (i + 1) / len(batches))
+    audio_bytes = audio[0] if len(audio) == 1 else join_speech(audio, batches)
+    job.finish_stage(stage)
+    return audio_bytes
+
+def _run_job_graph(job, graph):
+    """Run a job's task graph, reporting a cancellation rather than the errors it causes"""
+    try:
+        return graph.run()
+    except TaskError as e:
+        job.check_cancelled()
+        raise (e.__cause__ or e)
+
+def text_job(job, text, source_lang, target_lang, engine=None, hedge=None):
+    """Background job: translate text and synthesize both versions.
+    
+    Stages: original_audio, translation, translated_audio; the original
+    audio is synthesized while the text is being translated.
+    """
+    graph = TaskGraph()
+    graph.add("original_audio", lambda: synthesize_for_job(job, "original_audio", text, source_lang, engine, hedge))
+    graph.add("translation", lambda: translate_for_job(job, "translation", text, target_lang, source_lang))
+    graph.add("translated_audio",
+              lambda translated: synthesize_for_job(job, "translated_audio", translated, target_lang, engine, hedge),
+              deps=["translation"])
+    results = _run_job_graph(job, graph)
+    return {
+        "original_text": text,
+        "translated_text": results["translation"],
+        "original_audio": results["original_audio"],
+        "translated_audio": results["translated_audio"],
+        "source_lang": source_lang,
+        "target_lang": target_lang,
+        "engine": engine,
+    }
+
+def speech_job(job, audio_bytes, source_lang, target_lang, audio_format=None, engine=None, hedge=None):
+    """Background job: transcribe audio, translate the transcript and synthesize it.
+    
+    Stages: transcription, translation, translated_audio.
+    """
+    job.start_stage("transcription")
+    segments = speech_to_text_segments(
+        audio_bytes, source_lang, audio_format,
+        progress=lambda done, total: job.progress("transcription", done / total))
+    transcribed_text = transcript_text(segments)
+    if transcribed_text.startswith("Error"):
+        raise RuntimeError(transcribed_text)
+    job.finish_stage("transcription")
+    
+    translated_text = translate_for_job(job, "translation", transcribed_text, target_lang, source_lang)
+    translated_audio = synthesize_for_job(job, "translated_audio", translated_text, target_lang, engine, hedge)
+    return {
+        "original_text": transcribed_text,
+        "segments": segments,
+        "translated_text": translated_text,
+        "translated_audio": translated_audio,
+        "source_lang": source_lang,
+        "target_lang": target_lang,
+        "engine": engine,
+    }
+
+def text_fan_out_job(job, text, source_lang, target_langs, engine=None, hedge=None):
+    """Background job: synthesize a text once and translate it into several languages.
+    
+    Stages: languages.
+    """
+    job.start_stage("languages")
+    result = translate_to_many(text, source_lang, target_langs, engine, hedge,
+                               progress=lambda done, total: job.progress("languages", done / total),
+                               should_stop=job.check_cancelled)
+    job.finish_stage("languages")
+    return result
+
+def speech_fan_out_job(job, audio_bytes, source_lang, target_langs, audio_format=None, engine=None, hedge=None):
+    """Background job: transcribe a recording once and translate it into several languages.
+    
+    Stages: transcription, languages.
+    """
+    job.start_stage("transcription")
+    segments = speech_to_text_segments(
+        audio_bytes, source_lang, audio_format,
+        progress=lambda done, total: job.progress("transcription", done / total))
+    transcribed_text = transcript_text(segments)
+    if transcribed_text.startswith("Error"):
+        raise RuntimeError(transcribed_text)
+    job.finish_stage("transcription")
+    
+    job.start_stage("languages")
+    result = translate_to_many(transcribed_text, source_lang, target_langs, engine, hedge, original_audio=False,
+                               progress=lambda done, total: job.progress("languages", done / total),
+                               should_stop=job.check_cancelled)
+    result.update(original_audio=audio_bytes, segments=segments)
+    job.finish_stage("languages")
+    return result
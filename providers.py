@@ -0,0 +1,176 @@
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+# Errors worth retrying: rate limiting, server errors and network trouble
+RETRYABLE_STATUS = re.compile(r'\b(429|5\d\d)\b|too many requests|service unavailable|timed? ?out', re.IGNORECASE)
+RETRYABLE_ERRORS = (TimeoutError, ConnectionError)
+
+# Backoff between attempts: full jitter over an exponentially growing window
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+
+
+class SingleFlight:
+    """Share one call between every thread asking for the same key at the same time.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and get the same result (or exception). The
+    key is forgotten as soon as the call finishes, so this coalesces
+    concurrent duplicates without caching anything.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second on average, with bursts of up to ``burst``"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def acquire(self):
+        """Take a token, sleeping until one is available"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+                self.waited += delay
+            time.sleep(delay)
+
+
+def status_code(error):
+    """HTTP status of a provider error, from the response it carries if any"""
+    for holder in (error, getattr(error, "response", None), getattr(error, "rsp", None)):
+        code = getattr(holder, "status_code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_retryable(error):
+    """Whether an error is transient (429, 5xx, timeout, connection) rather than a bad request"""
+    code = status_code(error)
+    if code is not None:
+        return code == 429 or code >= 500
+    return isinstance(error, RETRYABLE_ERRORS) or bool(RETRYABLE_STATUS.search(str(error)))
+
+
+def retry_after(error):
+    """Seconds the provider asked us to wait, from a Retry-After header"""
+    for holder in (getattr(error, "response", None), getattr(error, "rsp", None)):
+        headers = getattr(holder, "headers", None)
+        if headers is not None:
+            try:
+                return float(headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+class Provider:
+    """Shared gate in front of one upstream service.
+
+    Calls for the same key are coalesced across sessions, every upstream
+    request takes a token from the provider's bucket, and transient errors
+    are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, name, rate=0, retries=3):
+        self.name = name
+        self.bucket = TokenBucket(rate)
+        self.retries = retries
+        self.inflight = SingleFlight()
+        self.retried = 0
+
+    def request(self, fn, retries=None):
+        """Make one upstream request through the rate limiter, retrying transient errors"""
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            self.bucket.acquire()
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == retries or not is_retryable(e):
+                    raise
+                self.retried += 1
+                delay = retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                time.sleep(delay)
+
+    def call(self, key, fn, retries=None):
+        """Request ``fn`` once for all concurrent callers with the same key"""
+        return self.inflight.do(key, lambda: self.request(fn, retries))
+
+    def stats(self):
+        return {
+            "provider": self.name,
+            "rate_limit": self.bucket.rate or None,
+            "coalesced": self.inflight.shared,
+            "retried": self.retried,
+            "throttled_s": round(self.bucket.waited, 2),
+        }
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name, rate=0, retries=3):
+    """Return the process-wide gate for a provider, created with the given limits on first use"""
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            provider = _providers[name] = Provider(name, rate, retries)
+        return provider
+
+
+def reset_providers():
+    """Forget every provider, so the next calls create them with the current limits"""
+    with _providers_lock:
+        _providers.clear()
+
+
+def provider_stats():
+    with _providers_lock:
+        return [provider.stats() for provider in _providers.values()]
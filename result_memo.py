@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Default limits of the result memo (overridable from the environment)
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+
+def memo_key(kind, content, **settings):
+    """Key of a result from a hash of its input (text or bytes) and every setting that affects it"""
+    digest = hashlib.sha256(content if isinstance(content, bytes) else content.encode("utf-8")).hexdigest()
+    payload = json.dumps([kind, digest, sorted(settings.items())], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _size(value):
+    """Approximate memory held by a result: its bytes and strings, recursively"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_size(item) for item in value)
+    return 8
+
+
+class ResultMemo:
+    """In-memory LRU of finished results (transcripts, translations, audio), shared by every session.
+
+    Streamlit reruns the page on every widget change; results kept here
+    are shown again, or reused by another session asking for the same
+    input with the same settings, without redoing the work. Memory is
+    bounded by both the number of entries and their total size.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        """Return a remembered result, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Remember a result, evicting the least recently used ones beyond the limits"""
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key):
+        """Forget one result so it is computed again next time"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry[1]
+            return entry is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"entries": len(self._entries), "size_bytes": self._size,
+                          "max_entries": self.max_entries, "max_bytes": self.max_bytes})
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_default_memo = None
+_default_lock = threading.Lock()
+
+
+def get_result_memo():
+    """Return the process-wide result memo configured from the environment"""
+    global _default_memo
+    with _default_lock:
+        if _default_memo is None:
+            _default_memo = ResultMemo(
+                int(os.getenv("RESULT_MEMO_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                int(os.getenv("RESULT_MEMO_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            )
+        return _default_memo
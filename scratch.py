@@ -0,0 +1,238 @@
+import contextlib
+import contextvars
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Default location and limits of the scratch space (overridable from the environment);
+# pointing SCRATCH_DIR at a tmpfs such as /dev/shm keeps temporary audio off the disk
+DEFAULT_SCRATCH_DIR = os.path.join(tempfile.gettempdir(), "tts_translator_scratch")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 900
+DEFAULT_REAP_INTERVAL = 60
+
+_current_scope = contextvars.ContextVar("scratch_scope", default=None)
+
+
+class ScratchQuotaExceeded(OSError):
+    """Raised when a request would take the scratch space over its quota"""
+
+
+class ScratchScope:
+    """Private directory of one request, removed with everything in it when the request ends"""
+
+    def __init__(self, space, path):
+        self.space = space
+        self.path = path
+        self.reserved = 0
+
+    def reserve(self, size):
+        """Claim ``size`` bytes of the quota for this scope, raising ScratchQuotaExceeded if it is full"""
+        self.space._reserve(self, size)
+
+
+class ScratchSpace:
+    """Temporary files of the whole process under one directory, with a size quota.
+
+    Every request works in its own scope directory, which is deleted when
+    the request ends, whether it succeeded or not. Directories and files
+    left behind by crashed processes, or created outside any scope, are
+    removed by ``reap`` once their owner is gone or they are older than
+    ``max_age_seconds``. Requests reserve the space they are about to
+    use, and a reservation that does not fit in ``max_bytes`` even after
+    reaping fails instead of filling the filesystem.
+    """
+
+    def __init__(self, directory=DEFAULT_SCRATCH_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 max_age_seconds=DEFAULT_MAX_AGE_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._live = {}
+        self._reserved = 0
+        self._orphan_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"scopes": 0, "rejected": 0, "reaped": 0}
+        os.makedirs(self.directory, exist_ok=True)
+
+    @contextlib.contextmanager
+    def scope(self, name="request"):
+        """Create a scope directory for the block and delete it on the way out"""
+        with self._lock:
+            # Registered under the lock so the reaper never sees an unowned new directory
+            path = tempfile.mkdtemp(prefix=f"{name}-{os.getpid()}-", dir=self.directory)
+            scope = self._live[path] = ScratchScope(self, path)
+            self._stats["scopes"] += 1
+        token = _current_scope.set(scope)
+        try:
+            yield scope
+        finally:
+            _current_scope.reset(token)
+            shutil.rmtree(path, ignore_errors=True)
+            with self._lock:
+                del self._live[path]
+                self._reserved -= scope.reserved
+
+    def _reserve(self, scope, size):
+        for attempt in range(2):
+            with self._lock:
+                if self._reserved + self._orphan_bytes + size <= self.max_bytes:
+                    self._reserved += size
+                    scope.reserved += size
+                    return
+            if attempt == 0:
+                # Orphans may be holding the space
+                self.reap()
+        with self._lock:
+            self._stats["rejected"] += 1
+        raise ScratchQuotaExceeded(
+            f"Scratch space is full: {size} bytes requested, {self.max_bytes} bytes allowed in {self.directory}")
+
+    def _owner_alive(self, name):
+        """Whether the process that created a scope directory is still running"""
+        try:
+            pid = int(name.split("-")[-2])
+        except (IndexError, ValueError):
+            return False
+        if pid == os.getpid():
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        return True
+
+    def reap(self):
+        """Remove entries no live scope owns; return the number of bytes freed"""
+        now = time.time()
+        freed = remaining = 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return 0
+        # Taken after listing: every scope directory listed was registered when it was created
+        with self._lock:
+            live = set(self._live)
+        for entry in entries:
+            if entry.path in live:
+                continue
+            try:
+                size = _disk_usage(entry)
+                age = now - entry.stat(follow_symlinks=False).st_mtime
+            except OSError:
+                continue
+            # Scopes of another running process are left alone until they are clearly abandoned
+            owned_elsewhere = entry.is_dir(follow_symlinks=False) and self._owner_alive(entry.name)
+            if entry.is_file(follow_symlinks=False) or owned_elsewhere:
+                if age < self.max_age_seconds:
+                    remaining += size
+                    continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                with contextlib.suppress(OSError):
+                    os.unlink(entry.path)
+            freed += size
+        with self._lock:
+            self._orphan_bytes = remaining
+            if freed:
+                self._stats["reaped"] += 1
+        if freed:
+            logger.info("Reaped %d bytes of orphaned scratch files", freed)
+        return freed
+
+    def usage(self, scan=False):
+        """Return the space counted against the quota, the quota and the scope counters.
+
+        The size is what requests reserved plus the orphans found by the
+        last ``reap``; ``scan=True`` also measures the directory on disk,
+        reported as ``disk_bytes`` and ``files``.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["live_scopes"] = len(self._live)
+            stats["reserved_bytes"] = self._reserved
+            stats["size_bytes"] = self._reserved + self._orphan_bytes
+        stats.update({"directory": self.directory, "max_bytes": self.max_bytes})
+        if scan:
+            files = size = 0
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    with contextlib.suppress(OSError):
+                        size += os.lstat(os.path.join(root, name)).st_size
+                        files += 1
+            stats.update({"files": files, "disk_bytes": size})
+        return stats
+
+    def start_reaper(self, interval=DEFAULT_REAP_INTERVAL):
+        """Reap orphans every ``interval`` seconds on a daemon thread"""
+        def loop():
+            while True:
+                try:
+                    self.reap()
+                except Exception:
+                    logger.exception("Scratch reaper failed")
+                time.sleep(interval)
+        thread = threading.Thread(target=loop, name="scratch-reaper", daemon=True)
+        thread.start()
+        return thread
+
+
+def _disk_usage(entry):
+    if not entry.is_dir(follow_symlinks=False):
+        return entry.stat(follow_symlinks=False).st_size
+    total = 0
+    for root, _, names in os.walk(entry.path):
+        for name in names:
+            with contextlib.suppress(OSError):
+                total += os.lstat(os.path.join(root, name)).st_size
+    return total
+
+
+def _named_temporary_file(*args, **kwargs):
+    """NamedTemporaryFile placed in the current scope, or in the scratch root outside any scope"""
+    if kwargs.get("dir") is None:
+        scope = _current_scope.get()
+        kwargs["dir"] = scope.path if scope is not None else get_scratch_space().directory
+    return tempfile.NamedTemporaryFile(*args, **kwargs)
+
+
+_pydub_redirected = False
+
+
+def redirect_pydub_temp_files():
+    """Make pydub create the temporary files it hands to FFmpeg in the scratch space.
+
+    pydub writes them to the system temporary directory and leaves them
+    behind when encoding fails; in a scope they are removed with it.
+    """
+    global _pydub_redirected
+    if not _pydub_redirected:
+        import pydub.audio_segment
+        pydub.audio_segment.NamedTemporaryFile = _named_temporary_file
+        _pydub_redirected = True
+
+
+_default_space = None
+_default_lock = threading.Lock()
+
+
+def get_scratch_space():
+    """Return the process-wide scratch space configured from the environment, with its reaper running"""
+    global _default_space
+    with _default_lock:
+        if _default_space is None:
+            _default_space = ScratchSpace(
+                os.getenv("SCRATCH_DIR", DEFAULT_SCRATCH_DIR),
+                int(os.getenv("SCRATCH_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                float(os.getenv("SCRATCH_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS)),
+            )
+            _default_space.start_reaper(float(os.getenv("SCRATCH_REAP_INTERVAL", DEFAULT_REAP_INTERVAL)))
+        return _default_space
@@ -0,0 +1,188 @@
+import re
+
+# Sentence-ending punctuation for every supported language. Terminators in
+# SPACED_TERMINATORS only end a sentence when followed by whitespace (so
+# "3.14" or "example.com" stay whole); the others end it immediately.
+SPACED_TERMINATORS = {
+    'en': '.!?…',
+    'fr': '.!?…',
+    'es': '.!?…',
+    'de': '.!?…',
+    'it': '.!?…',
+    'pt': '.!?…',
+    'ru': '.!?…',
+    'ja': '.!?',
+    'zh-cn': '.!?',
+    'ar': '.!?؟۔',
+}
+UNSPACED_TERMINATORS = {
+    'ja': '。！？．',
+    'zh-cn': '。！？．',
+}
+# Used when the language is unknown ('auto')
+DEFAULT_LANG = 'auto'
+SPACED_TERMINATORS[DEFAULT_LANG] = '.!?…؟۔'
+UNSPACED_TERMINATORS[DEFAULT_LANG] = '。！？．'
+
+# Closing quotes and brackets that belong to the sentence they end
+CLOSERS = '"\'”’»)]」』）'
+
+# Common abbreviations whose trailing period does not end a sentence
+ABBREVIATIONS = {
+    'en': {'mr', 'mrs', 'ms', 'dr', 'prof', 'st', 'vs', 'etc', 'e.g', 'i.e', 'jr', 'sr'},
+    'fr': {'m', 'mme', 'mlle', 'dr', 'pr', 'st', 'etc', 'cf', 'p', 'n°'},
+    'es': {'sr', 'sra', 'srta', 'dr', 'dra', 'ud', 'uds', 'etc', 'p.ej'},
+    'de': {'dr', 'prof', 'nr', 'z.b', 'usw', 'bzw', 'ca', 'vgl', 'str'},
+    'it': {'sig', 'sig.ra', 'dott', 'prof', 'ecc', 'es'},
+    'pt': {'sr', 'sra', 'dr', 'dra', 'prof', 'etc'},
+    'ru': {'г', 'ул', 'т.е', 'т.д', 'др', 'стр'},
+}
+ABBREVIATIONS[DEFAULT_LANG] = set().union(*ABBREVIATIONS.values())
+
+# Languages written without spaces between sentences
+NO_SPACE_LANGUAGES = ('ja', 'zh-cn')
+
+# Characters of text per request that each engine handles best: gTTS splits
+# its input into 100 character pieces and makes one HTTP call per piece, so
+# packing beyond that gains nothing; Azure and Google Translate accept a lot
+# more per request. 'tts' is the text handed to one call of any TTS engine,
+# which splits it further into requests of its own size.
+ENGINE_REQUEST_CHARS = {
+    'gtts': 100,
+    'azure': 5000,
+    'translate': 4500,
+    'tts': 5000,
+}
+
+_patterns = {}
+
+
+def _boundary_pattern(lang):
+    """Compile (once) the regex matching sentence ends for a language"""
+    if lang not in _patterns:
+        spaced = re.escape(SPACED_TERMINATORS.get(lang, SPACED_TERMINATORS[DEFAULT_LANG]))
+        unspaced = re.escape(UNSPACED_TERMINATORS.get(lang, ''))
+        alternatives = [rf'[{spaced}]+[{re.escape(CLOSERS)}]*(?=\s|$)']
+        if unspaced:
+            alternatives.append(rf'[{unspaced}]+[{re.escape(CLOSERS)}]*')
+        alternatives.append(r'(?=\n)')
+        _patterns[lang] = re.compile('|'.join(alternatives))
+    return _patterns[lang]
+
+
+def _is_abbreviation(text, end, lang):
+    """Whether the period ending at ``end`` closes a known abbreviation"""
+    if text[end - 1] != '.':
+        return False
+    words = text[:end - 1].rsplit(None, 1)
+    if not words:
+        return False
+    word = words[-1].lower().lstrip('(\'"«')
+    return word in ABBREVIATIONS.get(lang, ())
+
+
+def split_segments(text, lang=DEFAULT_LANG):
+    """Split text into (sentence, trailing whitespace) pairs using the language's punctuation"""
+    text = text or ''
+    pattern = _boundary_pattern(lang)
+    segments = []
+    start = 0
+    for match in pattern.finditer(text):
+        end = match.end()
+        if end <= start or _is_abbreviation(text, end, lang):
+            continue
+        separator_end = end
+        while separator_end < len(text) and text[separator_end].isspace():
+            separator_end += 1
+        segments.append((text[start:end], text[end:separator_end]))
+        start = separator_end
+    if start < len(text):
+        segments.append((text[start:], ''))
+
+    # Fold whitespace-only pieces into the separator of the previous sentence
+    merged = []
+    for segment, separator in segments:
+        if segment.strip():
+            merged.append((segment, separator))
+        elif merged:
+            merged[-1] = (merged[-1][0], merged[-1][1] + segment + separator)
+    return merged
+
+
+def split_sentences(text, lang=DEFAULT_LANG):
+    """Return the stripped sentences of a text"""
+    return [segment.strip() for segment, _ in split_segments(text, lang)]
+
+
+def join_segments(pieces, target_lang):
+    """Reassemble (sentence, separator) pairs, adapting spacing to the target language"""
+    parts = []
+    for i, (segment, separator) in enumerate(pieces):
+        last = i == len(pieces) - 1
+        if not last and '\n' not in separator:
+            # Adapt sentence spacing when translating between spaced and unspaced scripts
+            separator = '' if target_lang in NO_SPACE_LANGUAGES else (separator or ' ')
+        parts.append(segment.strip() + separator)
+    return ''.join(parts)
+
+
+def split_batches(text, lang, max_chars):
+    """Split text into consecutive pieces of whole sentences, each up to max_chars long.
+
+    Unlike ``chunk_text`` every piece keeps its original spacing and line
+    breaks, so the pieces concatenate back to the original text.
+    """
+    batches = []
+    current = ''
+    for segment, separator in split_segments(text, lang):
+        piece = segment + separator
+        if current and len(current) + len(piece) > max_chars:
+            batches.append(current)
+            current = ''
+        current += piece
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _split_long_sentence(sentence, max_chars):
+    """Cut a sentence longer than max_chars at spaces, or hard if it has none"""
+    parts = []
+    while len(sentence) > max_chars:
+        cut = sentence.rfind(' ', 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        parts.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        parts.append(sentence)
+    return parts
+
+
+def pack_chunks(sentences, max_chars):
+    """Group consecutive sentences into as few chunks as fit in max_chars each.
+
+    Sentence boundaries are kept inside each chunk, so the engine still
+    pauses at the punctuation, and a pause can be added between chunks.
+    """
+    chunks = []
+    current, size = [], 0
+    for sentence in sentences:
+        for piece in _split_long_sentence(sentence.strip(), max_chars):
+            # Count the space that will separate this piece from the previous one
+            extra = len(piece) + (1 if current else 0)
+            if current and size + extra > max_chars:
+                chunks.append(current)
+                current, size, extra = [], 0, len(piece)
+            current.append(piece)
+            size += extra
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_text(text, lang, engine):
+    """Split text into request-sized strings for an engine, cutting only at sentence ends"""
+    glue = '' if lang in NO_SPACE_LANGUAGES else ' '
+    max_chars = ENGINE_REQUEST_CHARS.get(engine, ENGINE_REQUEST_CHARS['gtts'])
+    return [glue.join(chunk) for chunk in pack_chunks(split_sentences(text, lang), max_chars)]
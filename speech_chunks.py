@@ -0,0 +1,130 @@
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lazy_imports import lazy_module
+from tracing import propagate, span
+
+np = lazy_module("numpy")
+pydub = lazy_module("pydub")
+sr = lazy_module("speech_recognition")
+
+# Audio is decoded once to the format the recognizer expects
+RECOGNITION_RATE = 16000
+RECOGNITION_WIDTH = 2
+
+# Chunking parameters: cut at a silence once a chunk is long enough, and
+# force a cut before it grows past what the recognition service accepts
+WINDOW_MS = 10
+MIN_SILENCE_MS = 350
+SILENCE_THRESHOLD_DB = -16
+MIN_CHUNK_MS = 5000
+MAX_CHUNK_MS = 30000
+
+
+def decode_audio(audio_bytes, audio_format=None):
+    """Decode an upload (WAV, MP3, OGG...) to mono 16-bit PCM at the recognition rate"""
+    audio = pydub.AudioSegment.from_file(io.BytesIO(audio_bytes), format=audio_format)
+    return audio.set_channels(1).set_frame_rate(RECOGNITION_RATE).set_sample_width(RECOGNITION_WIDTH)
+
+
+def find_chunks(samples, frame_rate, min_silence_ms=MIN_SILENCE_MS, silence_threshold_db=SILENCE_THRESHOLD_DB,
+                min_chunk_ms=MIN_CHUNK_MS, max_chunk_ms=MAX_CHUNK_MS):
+    """Split int16 samples at silences, returning (start_ms, end_ms) chunk boundaries.
+
+    Silence is detected on a per-window RMS envelope relative to the overall
+    loudness, computed in one vectorized pass over the samples.
+    """
+    window = max(1, frame_rate * WINDOW_MS // 1000)
+    count = len(samples) // window
+    duration_ms = len(samples) * 1000 // frame_rate
+    if count == 0:
+        return [(0, duration_ms)] if duration_ms else []
+
+    frames = samples[:count * window].astype(np.float32).reshape(count, window)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    overall = np.sqrt(np.mean(rms * rms))
+    if overall == 0:
+        return []
+    silent = 20 * np.log10(rms / overall + 1e-10) < silence_threshold_db
+
+    # Cut candidates are the middles of silent runs that are long enough
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    long_runs = (ends - starts) * WINDOW_MS >= min_silence_ms
+    cuts = ((starts[long_runs] + ends[long_runs]) // 2 * WINDOW_MS).tolist()
+
+    chunks = []
+    chunk_start = 0
+    for cut in cuts + [duration_ms]:
+        while cut - chunk_start > max_chunk_ms:
+            chunks.append((chunk_start, chunk_start + max_chunk_ms))
+            chunk_start += max_chunk_ms
+        if cut - chunk_start >= min_chunk_ms:
+            chunks.append((chunk_start, cut))
+            chunk_start = cut
+    if chunk_start < duration_ms:
+        # Merge a short tail into the previous chunk rather than sending a tiny request
+        if chunks and duration_ms - chunks[-1][0] <= max_chunk_ms:
+            chunks[-1] = (chunks[-1][0], duration_ms)
+        else:
+            chunks.append((chunk_start, duration_ms))
+    return chunks
+
+
+def _recognize_chunk(recognizer, audio_data, language, retries):
+    """Recognize one chunk, retrying only this chunk on service errors"""
+    for attempt in range(retries + 1):
+        try:
+            return recognizer.recognize_google(audio_data, language=language)
+        except sr.UnknownValueError:
+            # No speech in this chunk, nothing to retry
+            return ""
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def transcribe_chunks(audio, language, max_workers=4, retries=2, progress=None):
+    """Recognize an AudioSegment chunk by chunk on a bounded pool.
+
+    Returns a list of {"start", "end", "text", "error"} dicts in time order,
+    with times in milliseconds. ``progress(done, total)`` is called as
+    chunks finish, from the worker threads.
+    """
+    samples = np.frombuffer(audio.raw_data, dtype=np.int16)
+    chunks = find_chunks(samples, audio.frame_rate)
+    recognizer = sr.Recognizer()
+    per_ms = audio.frame_rate // 1000
+    finished = []
+    finished_lock = threading.Lock()
+
+    def recognize(chunk):
+        start, end = chunk
+        audio_data = sr.AudioData(samples[start * per_ms:end * per_ms].tobytes(), audio.frame_rate, RECOGNITION_WIDTH)
+        result = {"start": start, "end": end, "text": "", "error": None}
+        try:
+            with span("recognize_chunk"):
+                result["text"] = _recognize_chunk(recognizer, audio_data, language, retries)
+        except Exception as e:
+            result["error"] = str(e)
+        if progress is not None:
+            with finished_lock:
+                finished.append(chunk)
+                count = len(finished)
+            progress(count, len(chunks))
+        return result
+
+    if len(chunks) <= 1 or max_workers <= 1:
+        return [recognize(chunk) for chunk in chunks]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        return list(executor.map(propagate(recognize), chunks))
+
+
+def format_timestamp(ms):
+    """Format milliseconds as mm:ss.s"""
+    minutes, seconds = divmod(ms / 1000, 60)
+    return f"{int(minutes):02d}:{seconds:04.1f}"
@@ -0,0 +1,157 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskError(Exception):
+    """Raised when a task of the graph failed or was skipped because a dependency failed"""
+
+
+class _Task:
+    def __init__(self, name, fn, deps):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.dependents = []
+        self.state = "pending"
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+
+class TaskGraph:
+    """Run small pipelines of dependent stages concurrently.
+
+    Each task is a callable receiving the results of its dependencies as
+    positional arguments, in the order they were declared. A task starts
+    as soon as all of its dependencies have finished, independent tasks
+    run in parallel, and timings are kept to report the critical path.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._origin = None
+        self._remaining = 0
+        self._all_done = threading.Event()
+
+    def add(self, name, fn, deps=()):
+        """Register a task; dependencies must already be in the graph, so cycles are impossible"""
+        if name in self._tasks:
+            raise ValueError(f"Task {name!r} already exists")
+        for dep in deps:
+            if dep not in self._tasks:
+                raise ValueError(f"Unknown dependency {dep!r} for task {name!r}")
+        task = _Task(name, fn, deps)
+        for dep in deps:
+            self._tasks[dep].dependents.append(task)
+        self._tasks[name] = task
+        return self
+
+    def start(self, max_workers=None, initializer=None):
+        """Start running the graph in the background and return immediately"""
+        if self._executor is not None:
+            raise RuntimeError("Task graph already started")
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or max(1, len(self._tasks)),
+            initializer=initializer,
+        )
+        self._origin = time.perf_counter()
+        self._remaining = len(self._tasks)
+        if not self._tasks:
+            self._all_done.set()
+        for task in list(self._tasks.values()):
+            if not task.deps:
+                self._submit(task)
+        return self
+
+    def _submit(self, task):
+        task.state = "running"
+        args = [self._tasks[dep].result for dep in task.deps]
+        self._executor.submit(self._execute, task, args)
+
+    def _execute(self, task, args):
+        task.started = time.perf_counter()
+        try:
+            task.result = task.fn(*args)
+            task.state = "done"
+        except BaseException as e:
+            task.error = e
+            task.state = "failed"
+        task.finished = time.perf_counter()
+        self._settle(task)
+
+    def _settle(self, task):
+        """Mark a task finished and start or skip the dependents it unblocks"""
+        ready = []
+        with self._lock:
+            finished = [task]
+            while finished:
+                current = finished.pop()
+                current.done.set()
+                self._remaining -= 1
+                for dependent in current.dependents:
+                    if dependent.state != "pending":
+                        continue
+                    dep_states = [self._tasks[dep].state for dep in dependent.deps]
+                    if any(state in ("failed", "skipped") for state in dep_states):
+                        dependent.state = "skipped"
+                        dependent.error = TaskError(f"Skipped because a dependency of {dependent.name!r} failed")
+                        finished.append(dependent)
+                    elif all(state == "done" for state in dep_states):
+                        dependent.state = "running"
+                        ready.append(dependent)
+            if self._remaining == 0:
+                self._all_done.set()
+        for dependent in ready:
+            args = [self._tasks[dep].result for dep in dependent.deps]
+            self._executor.submit(self._execute, dependent, args)
+
+    def result(self, name, timeout=None):
+        """Block until one task is finished and return its result"""
+        task = self._tasks[name]
+        if not task.done.wait(timeout):
+            raise TimeoutError(f"Task {name!r} did not finish in time")
+        if task.state != "done":
+            if isinstance(task.error, TaskError):
+                raise task.error
+            raise TaskError(f"Task {name!r} failed: {task.error}") from task.error
+        return task.result
+
+    def wait(self, timeout=None):
+        """Block until every task is finished and return a {name: result} dict"""
+        if not self._all_done.wait(timeout):
+            raise TimeoutError("Task graph did not finish in time")
+        self._executor.shutdown(wait=False)
+        return {name: self.result(name) for name in self._tasks}
+
+    def run(self, max_workers=None, initializer=None):
+        """Run the whole graph and return a {name: result} dict"""
+        return self.start(max_workers, initializer).wait()
+
+    def timings(self):
+        """Return {name: (start offset, duration)} in seconds for the tasks that ran"""
+        return {
+            task.name: (round(task.started - self._origin, 3), round(task.finished - task.started, 3))
+            for task in self._tasks.values()
+            if task.started is not None and task.finished is not None
+        }
+
+    def critical_path(self):
+        """Return ([(name, duration)...], total seconds) for the chain that finished last"""
+        ran = [task for task in self._tasks.values() if task.finished is not None]
+        if not ran:
+            return [], 0.0
+        task = max(ran, key=lambda t: t.finished)
+        total = round(task.finished - self._origin, 3)
+        path = []
+        while task is not None:
+            path.append((task.name, round(task.finished - task.started, 3)))
+            # The dependency that finished last is the one that gated this task
+            deps = [self._tasks[dep] for dep in task.deps if self._tasks[dep].finished is not None]
+            task = max(deps, key=lambda t: t.finished) if deps else None
+        path.reverse()
+        return path, total
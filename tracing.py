@@ -0,0 +1,190 @@
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Log the whole span tree of operations slower than this (0 disables)
+TRACE_SLOW_MS = float(os.getenv('TRACE_SLOW_MS', '0'))
+# Write metrics to this file (.json for JSON, anything else for Prometheus text)
+METRICS_FILE = os.getenv('METRICS_FILE', '')
+METRICS_FILE_INTERVAL = 10.0
+# Recent durations kept per series to compute percentiles
+SAMPLES_PER_SERIES = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation, with labels and the spans it contains"""
+
+    def __init__(self, name, labels, parent):
+        self.name = name
+        self.labels = labels
+        self.parent = parent
+        self.children = []
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **labels):
+        """Add labels only known once the operation is under way (cache hit, engine used...)"""
+        self.labels.update({key: str(value) for key, value in labels.items()})
+
+    def tree(self, depth=0):
+        """Indented text rendering of this span and its children"""
+        line = "  " * depth + self.name
+        if self.labels:
+            line += " [" + ", ".join(f"{key}={value}" for key, value in self.labels.items()) + "]"
+        line += f" {self.duration * 1000:.1f} ms" if self.duration is not None else " running"
+        lines = [line]
+        for child in self.children:
+            lines.append(child.tree(depth + 1))
+        return "\n".join(lines)
+
+
+class _Series:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=SAMPLES_PER_SERIES)
+
+    def quantile(self, q):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_series = {}
+_series_lock = threading.Lock()
+_last_export = [0.0]
+
+
+def _record(span):
+    key = (span.name, tuple(sorted(span.labels.items())))
+    with _series_lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = _Series()
+        series.count += 1
+        series.total += span.duration
+        series.samples.append(span.duration)
+
+
+@contextlib.contextmanager
+def span(name, **labels):
+    """Time a block as a span nested in the current one.
+
+    Every span feeds the duration histogram of its (name, labels) series;
+    root spans slower than TRACE_SLOW_MS are logged with their whole tree.
+    """
+    parent = _current.get()
+    current = Span(name, {key: str(value) for key, value in labels.items()}, parent)
+    if parent is not None:
+        parent.children.append(current)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException:
+        current.set(error="true")
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        _current.reset(token)
+        _record(current)
+        if parent is None:
+            _finish_root(current)
+
+
+def annotate(**labels):
+    """Label the current span, if any, from code that does not hold it"""
+    current = _current.get()
+    if current is not None:
+        current.set(**labels)
+
+
+def traced(name, **labels):
+    """Decorator running a function inside a span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def propagate(fn):
+    """Wrap fn so that, run in another thread, its spans nest under the caller's current span"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def _finish_root(root):
+    if TRACE_SLOW_MS and root.duration * 1000 >= TRACE_SLOW_MS:
+        logger.warning("Slow operation (%.0f ms):\n%s", root.duration * 1000, root.tree())
+    if METRICS_FILE and time.monotonic() - _last_export[0] >= METRICS_FILE_INTERVAL:
+        _last_export[0] = time.monotonic()
+        try:
+            write_metrics(METRICS_FILE)
+        except OSError as e:
+            logger.warning("Could not write metrics to %s: %s", METRICS_FILE, e)
+
+
+def summary():
+    """Return one dict per series with its count, total and p50/p95/p99 in seconds"""
+    with _series_lock:
+        items = list(_series.items())
+        rows = []
+        for (name, labels), series in sorted(items):
+            row = {"span": name, "labels": dict(labels), "count": series.count, "total_s": round(series.total, 4)}
+            for q in QUANTILES:
+                value = series.quantile(q)
+                row[f"p{int(q * 100)}_s"] = round(value, 4) if value is not None else None
+            rows.append(row)
+    return rows
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    """Metrics in the Prometheus text exposition format, as a summary per span series"""
+    lines = [
+        "# HELP tts_span_seconds Duration of traced operations",
+        "# TYPE tts_span_seconds summary",
+    ]
+    for row in summary():
+        pairs = [("span", row["span"])] + list(row["labels"].items())
+        labels = ",".join(f'{key}="{_escape(value)}"' for key, value in pairs)
+        for q in QUANTILES:
+            value = row[f"p{int(q * 100)}_s"]
+            if value is not None:
+                lines.append(f'tts_span_seconds{{{labels},quantile="{q}"}} {value}')
+        lines.append(f"tts_span_seconds_sum{{{labels}}} {row['total_s']}")
+        lines.append(f"tts_span_seconds_count{{{labels}}} {row['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_json():
+    return json.dumps({"generated_at": time.time(), "spans": summary()}, indent=2)
+
+
+def write_metrics(path):
+    """Write the metrics atomically, as JSON if the path ends in .json, else as Prometheus text"""
+    data = metrics_json() if path.endswith(".json") else prometheus_text()
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
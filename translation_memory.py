@@ -0,0 +1,143 @@
+import contextlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from audio_cache import normalize_text
+
+# Default location and limits of the translation memory (overridable from the environment)
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "tts_translator_cache", "translation_memory.sqlite3")
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 100000
+
+class TranslationMemory:
+    """SQLite-backed store of translated segments.
+
+    Rows are keyed by (source language, target language, normalized
+    segment). Entries older than ``ttl_seconds`` are ignored and pruned,
+    and the least recently used rows are dropped once ``max_entries`` is
+    exceeded. A connection is opened per operation so the memory can be
+    shared by threads and Streamlit worker processes.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0}
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS segments (
+                    source_lang TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    segment TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (source_lang, target_lang, segment)
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_segments_last_used ON segments (last_used)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, source_lang, target_lang, segments):
+        """Return a {normalized segment: translation} dict of known, unexpired segments"""
+        keys = list(dict.fromkeys(normalize_text(s) for s in segments))
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        with self._connect() as conn:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"""SELECT segment, translation FROM segments
+                        WHERE source_lang = ? AND target_lang = ? AND created_at >= ?
+                        AND segment IN ({placeholders})""",
+                    [source_lang, target_lang, now - self.ttl_seconds] + batch,
+                ).fetchall()
+                found.update(rows)
+            if found:
+                conn.executemany(
+                    "UPDATE segments SET last_used = ? WHERE source_lang = ? AND target_lang = ? AND segment = ?",
+                    [(now, source_lang, target_lang, key) for key in found],
+                )
+        with self._lock:
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(keys) - len(found)
+        return found
+
+    def store(self, source_lang, target_lang, pairs):
+        """Record (segment, translation) pairs and enforce the size limits"""
+        now = time.time()
+        rows = [
+            (source_lang, target_lang, normalize_text(segment), translation, now, now)
+            for segment, translation in pairs
+            if segment.strip() and translation
+        ]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?, ?)", rows)
+        with self._lock:
+            self._stats["stores"] += len(rows)
+        self.prune()
+
+    def prune(self):
+        """Drop expired rows, then the least recently used ones above max_entries"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM segments WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM segments").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM segments WHERE rowid IN (SELECT rowid FROM segments ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def clear(self):
+        """Delete every stored segment"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM segments")
+
+    def stats(self):
+        """Return hit/miss counters and the number of stored segments"""
+        with self._lock:
+            stats = dict(self._stats)
+        with self._connect() as conn:
+            (stats["entries"],) = conn.execute("SELECT COUNT(*) FROM segments").fetchone()
+        stats["max_entries"] = self.max_entries
+        return stats
+
+
+_default_memory = None
+_default_lock = threading.Lock()
+
+
+def get_translation_memory():
+    """Return the process-wide translation memory configured from the environment"""
+    global _default_memory
+    with _default_lock:
+        if _default_memory is None:
+            _default_memory = TranslationMemory(
+                os.getenv("TRANSLATION_MEMORY_PATH", DEFAULT_DB_PATH),
+                int(os.getenv("TRANSLATION_MEMORY_TTL", DEFAULT_TTL_SECONDS)),
+                int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            )
+        return _default_memory